@@ -3,84 +3,147 @@ Auto News Pipeline - Article Generator
 Uses Groq to generate SEO-optimized articles from news sources.
 """
 
+from __future__ import annotations
+
 import logging
 import json
+import re
+import hashlib
 import random
-import time
-from typing import Dict, List, Optional
+import unicodedata
+import zlib
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
-from slugify import slugify
-from groq import Groq
 
-from .config import GROQ_API_KEY, GROQ_CONFIG, SITE_NAME, ARTICLE_CONFIG
+# groq (httpx, pydantic) is slow to import, so it is only loaded once it is
+# actually needed
+if TYPE_CHECKING:
+    from groq import Groq
+
+from .config import GROQ_CONFIG, SITE_NAME, ARTICLE_CONFIG, LEONARDO_CONFIG
+from .cache import get_cached, set_cached, get_similar, set_similar
+from .groq_client import get_groq_client, chat_completion, parse_json_reply
+from .image_generator import generate_featured_image, create_placeholder_result
 
 logger = logging.getLogger(__name__)
 
-# Rate limiting settings - tuned for Groq free tier
-API_CALL_DELAY = 5.0  # Seconds between API calls (increased for free tier)
-MAX_RETRIES = 3
-RETRY_BACKOFF = 15  # Initial backoff seconds, doubles each retry
+# Characters of streamed article text needed before SEO metadata can start
+# (enough to hold the H1 and the opening sentence it is built from)
+METADATA_PREVIEW_CHARS = 500
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+_SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+SLUG_MAX_LENGTH = 80
+
 
+def _content_preview(content: str, max_chars: int = 200) -> str:
+    """First sentence of the article body, skipping markdown headings."""
+    body = " ".join(
+        line.strip() for line in content[:METADATA_PREVIEW_CHARS].splitlines()
+        if line.strip() and not line.lstrip().startswith('#')
+    )
+    return _SENTENCE_END_RE.split(body, 1)[0][:max_chars]
 
-def rate_limited_api_call(func):
+
+@lru_cache(maxsize=1024)
+def _slug(text: str) -> str:
     """
-    Decorator for rate-limited API calls with exponential backoff retry.
-    Prevents 429 errors by adding delays and automatic retries.
+    URL slug: accents folded to ASCII, runs of anything else collapsed to
+    single hyphens. Memoised; the same titles are slugified at several stages.
     """
-    def wrapper(*args, **kwargs):
-        retries = 0
-        last_error = None
-        
-        while retries <= MAX_RETRIES:
-            try:
-                # Add delay before each call to prevent rate limiting
-                if retries > 0:
-                    backoff_time = RETRY_BACKOFF * (2 ** (retries - 1))
-                    logger.warning(f"Rate limit retry {retries}/{MAX_RETRIES}, waiting {backoff_time}s...")
-                    time.sleep(backoff_time)
-                else:
-                    time.sleep(API_CALL_DELAY)
-                
-                return func(*args, **kwargs)
-                
-            except Exception as e:
-                error_str = str(e)
-                if "429" in error_str or "rate_limit" in error_str.lower():
-                    retries += 1
-                    last_error = e
-                    logger.warning(f"Rate limit hit: {e}")
-                else:
-                    # Non-rate-limit error, re-raise immediately
-                    raise e
-        
-        # All retries exhausted
-        logger.error(f"Rate limit retries exhausted: {last_error}")
-        raise last_error
-    
-    return wrapper
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return _SLUG_RE.sub('-', ascii_text.lower())[:SLUG_MAX_LENGTH].strip('-')
 
 
-def get_groq_client() -> Optional[Groq]:
-    """Initialize Groq client."""
-    if not GROQ_API_KEY:
-        logger.warning("GROQ_API_KEY not set.")
-        return None
-    return Groq(api_key=GROQ_API_KEY)
+def _log_usage(response, max_tokens: int) -> None:
+    """Debug-log output token usage, to keep the max_tokens budgets honest."""
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        logger.debug(f"Groq completion used {usage.completion_tokens}/{max_tokens} tokens")
 
 
-def generate_seo_titles(client: Groq, article: Dict) -> List[Dict]:
+def _article_seed(article: Dict) -> int:
+    """Stable per-article sampling seed (unlike hash(), survives restarts)."""
+    return zlib.crc32(article['id'].encode())
+
+
+def _cached_json_completion(
+    client: Groq,
+    messages: List[Dict],
+    temperature: float,
+    max_tokens: int,
+    seed: Optional[int] = None,
+    required_keys: Tuple[str, ...] = (),
+    model: Optional[str] = None,
+    user: Optional[str] = None
+):
     """
-    Generate 5 SEO-optimized title options for the article.
-    Returns list of titles with scores.
-    
-    NEW: Focus on SEARCH-INTENT headlines that people would actually Google.
+    Run a chat completion that answers with JSON, reusing earlier responses
+    for byte-identical requests made within the last ARTICLE_CONFIG['hours_lookback']
+    hours. Sampled requests (temperature > 0) are only cached when seeded.
+    Only responses that parse and contain all required_keys are cached; a
+    reply missing keys gets one retry with an explicit reminder before a
+    ValueError is raised. model defaults to GROQ_CONFIG['model']; user (the
+    source article id) is passed through to Groq but is not part of the cache key.
     """
-    prompt = f"""Generate 5 headline options that pass this test:
-"Would someone type this EXACT phrase into Google?"
+    model = model or GROQ_CONFIG['model']
+    key_source = json.dumps([model, messages, temperature, max_tokens, seed], sort_keys=True)
+    key = hashlib.blake2b(key_source.encode(), digest_size=16).hexdigest()
+    cacheable = temperature == 0 or seed is not None
+    
+    result_text = get_cached("groq", key, ARTICLE_CONFIG['hours_lookback'] * 3600) if cacheable else None
+    cache_hit = result_text is not None
+    
+    if cache_hit:
+        logger.info("Reusing cached Groq response")
+        return parse_json_reply(result_text)
+    
+    extra = {"seed": seed} if seed is not None else {}
+    if user is not None:
+        extra["user"] = user
+    request_messages = messages
+    
+    for attempt in range(2):
+        response = chat_completion(
+            client,
+            model=model,
+            messages=request_messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            **extra
+        )
+        _log_usage(response, max_tokens)
+        result_text = response.choices[0].message.content.strip()
+        result = parse_json_reply(result_text)
+        
+        missing = [k for k in required_keys if not isinstance(result, dict) or k not in result]
+        if not missing:
+            if cacheable:
+                set_cached("groq", key, result_text)
+            return result
+        
+        logger.warning(f"Groq reply missing required keys {missing} (attempt {attempt + 1}/2)")
+        request_messages = messages + [{
+            "role": "system",
+            "content": f"Respond with a single JSON object that contains all of these keys: {', '.join(required_keys)}."
+        }]
+    
+    raise ValueError(f"Groq reply missing required keys: {missing}")
 
-ORIGINAL TITLE: {article['title']}
-SUMMARY: {article['summary']}
-TOPIC: {article.get('classification', {}).get('primary_topic', 'Technology')}
+
+# Static instructions live in the system messages so that every request for a
+# stage starts with a byte-identical prefix (reusable by provider prompt
+# caching); only the per-article fields go into the user message, filled in
+# from the *_USER_TEMPLATE constants.
+TITLES_SYSTEM_PROMPT = """You are an SEO expert and headline writer.
+
+Generate 5 headline options for the article you are given that pass this test:
+"Would someone type this EXACT phrase into Google?"
 
 BAD HEADLINES (marketing-speak, no one Googles these):
 - "Transforming Transportation: Waymo's Gemini AI Assistant Unveiled"
@@ -100,34 +163,50 @@ RULES:
 5. Include the ACTUAL thing people will search for
 6. Avoid: "revolutionary", "game-changing", "unlock", "transform", "power of"
 
-Respond with JSON array:
-[
-    {{"title": "Your Title Here", "score": 85, "keywords": ["key1", "key2"]}},
-    ...
-]
+Respond with JSON:
+{
+    "titles": [
+        {"title": "Your Title Here", "score": 85, "keywords": ["key1", "key2"]},
+        ...
+    ]
+}
 
 Rank by SEARCHABILITY - how likely someone would Google this exact phrase.
-Only respond with the JSON array, no other text."""
+Only respond with JSON, no other text."""
+
+TITLES_USER_TEMPLATE = """ORIGINAL TITLE: {title}
+SUMMARY: {summary}
+TOPIC: {topic}"""
+
+
+def generate_seo_titles(client: Groq, article: Dict) -> List[Dict]:
+    """
+    Generate 5 SEO-optimized title options for the article.
+    Returns list of titles with scores.
+    
+    NEW: Focus on SEARCH-INTENT headlines that people would actually Google.
+    """
+    prompt = TITLES_USER_TEMPLATE.format_map({
+        'title': article['title'],
+        'summary': article['summary'],
+        'topic': article.get('classification', {}).get('primary_topic', 'Technology')
+    })
 
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
+        result = _cached_json_completion(
+            client,
             messages=[
-                {"role": "system", "content": "You are an SEO expert and headline writer."},
+                {"role": "system", "content": TITLES_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.8,
-            max_tokens=1000
+            max_tokens=400,
+            seed=_article_seed(article),
+            required_keys=('titles',),
+            model=GROQ_CONFIG['title_model'],
+            user=article['id']
         )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Clean markdown formatting
-        if result_text.startswith('```'):
-            result_text = result_text.split('\n', 1)[1]
-            result_text = result_text.rsplit('```', 1)[0]
-        
-        titles = json.loads(result_text)
+        titles = result.get('titles', [])
         
         # Sort by score
         titles.sort(key=lambda x: x.get('score', 0), reverse=True)
@@ -141,17 +220,9 @@ Only respond with the JSON array, no other text."""
         return [{"title": article['title'], "score": 50, "keywords": []}]
 
 
-def generate_outline(client: Groq, article: Dict, selected_title: str) -> Dict:
-    """
-    Generate a structured blog outline with H1, H2 headers.
-    """
-    prompt = f"""Create a detailed blog outline for this article.
-
-TITLE: {selected_title}
-TOPIC: {article.get('classification', {}).get('primary_topic', 'Technology')}
-SOURCE SUMMARY: {article['summary']}
+OUTLINE_SYSTEM_PROMPT = """You are a content strategist and SEO expert.
 
-Create an outline with:
+Create a detailed blog outline for the article you are given, with:
 - H1 (main title)
 - 4-6 H2 sections
 - Key points for each section
@@ -159,41 +230,52 @@ Create an outline with:
 - Optimized for featured snippets
 
 Respond with JSON:
-{{
+{
     "h1": "Main Title",
     "intro_hook": "Opening sentence to grab attention",
     "sections": [
-        {{"h2": "Section Title", "key_points": ["point1", "point2", "point3"]}},
+        {"h2": "Section Title", "key_points": ["point1", "point2", "point3"]},
         ...
     ],
     "faq": [
-        {{"question": "Q1?", "answer_preview": "Brief answer"}},
+        {"question": "Q1?", "answer_preview": "Brief answer"},
         ...
     ],
     "target_keywords": ["keyword1", "keyword2", "keyword3"],
     "meta_description_hint": "Key message for meta description"
-}}
+}
 
 Only respond with JSON."""
 
+OUTLINE_USER_TEMPLATE = """TITLE: {title}
+TOPIC: {topic}
+SOURCE SUMMARY: {summary}"""
+
+
+def generate_outline(client: Groq, article: Dict, selected_title: str) -> Dict:
+    """
+    Generate a structured blog outline with H1, H2 headers.
+    """
+    prompt = OUTLINE_USER_TEMPLATE.format_map({
+        'title': selected_title,
+        'topic': article.get('classification', {}).get('primary_topic', 'Technology'),
+        'summary': article['summary']
+    })
+
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
+        outline = _cached_json_completion(
+            client,
             messages=[
-                {"role": "system", "content": "You are a content strategist and SEO expert."},
+                {"role": "system", "content": OUTLINE_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
-            max_tokens=1500
+            temperature=0,
+            max_tokens=700,
+            seed=_article_seed(article),
+            required_keys=('h1', 'sections'),
+            model=GROQ_CONFIG['outline_model'],
+            user=article['id']
         )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        if result_text.startswith('```'):
-            result_text = result_text.split('\n', 1)[1]
-            result_text = result_text.rsplit('```', 1)[0]
-        
-        outline = json.loads(result_text)
         logger.info(f"Generated outline with {len(outline.get('sections', []))} sections")
         return outline
         
@@ -209,34 +291,128 @@ Only respond with JSON."""
         }
 
 
-def generate_article_content(client: Groq, article: Dict, outline: Dict) -> str:
+PLAN_SYSTEM_PROMPT = """You are an SEO expert, headline writer and content strategist.
+
+First, generate 5 headline options for the article you are given that pass this test:
+"Would someone type this EXACT phrase into Google?"
+
+BAD HEADLINES (marketing-speak, no one Googles these):
+- "Transforming Transportation: Waymo's Gemini AI Assistant Unveiled"
+- "The Future of AI: Revolutionary Breakthroughs Await"
+- "Unlock the Power of Machine Learning Today"
+
+GOOD HEADLINES (search-intent, people actually Google these):
+- "Waymo robotaxis now use Gemini AI — here's what changed"
+- "OpenAI GPT-5 release date and new features explained"
+- "Google Gemini vs ChatGPT: which AI is better in 2025"
+
+RULES:
+1. Lead with the product/company name (most important keyword first)
+2. Use "now", "today", "just", "finally" for breaking news
+3. Use conversational phrasing, NOT marketing buzzwords
+4. 8-12 words max
+5. Include the ACTUAL thing people will search for
+6. Avoid: "revolutionary", "game-changing", "unlock", "transform", "power of"
+
+Rank the headlines by SEARCHABILITY - how likely someone would Google this exact phrase.
+
+Then, create a detailed blog outline using the TOP-RANKED headline as its H1, with:
+- 4-6 H2 sections
+- Key points for each section
+- FAQ section (3 questions)
+- Optimized for featured snippets
+
+Finally, draft SEO metadata for the article under the top-ranked headline.
+
+Respond with JSON:
+{
+    "titles": [
+        {"title": "Your Title Here", "score": 85, "keywords": ["key1", "key2"]},
+        ...
+    ],
+    "outline": {
+        "h1": "Top-ranked title",
+        "intro_hook": "Opening sentence to grab attention",
+        "sections": [
+            {"h2": "Section Title", "key_points": ["point1", "point2", "point3"]},
+            ...
+        ],
+        "faq": [
+            {"question": "Q1?", "answer_preview": "Brief answer"},
+            ...
+        ],
+        "target_keywords": ["keyword1", "keyword2", "keyword3"],
+        "meta_description_hint": "Key message for meta description"
+    },
+    "meta_draft": {
+        "meta_title": "SEO title (50-60 chars)",
+        "meta_description": "Compelling description (150-160 chars)",
+        "slug": "url-friendly-slug",
+        "image_alt": "Descriptive alt text for featured image",
+        "og_title": "Open Graph title",
+        "og_description": "Open Graph description",
+        "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"]
+    }
+}
+
+Only respond with JSON, no other text."""
+
+
+def generate_plan(client: Groq, article: Dict) -> Dict:
     """
-    Generate the full article content (1000-1500 words).
+    Generate the SEO title options, the outline and a metadata draft in a
+    single request. The stages share the same source context, so fusing
+    them saves round trips and repeated passes over the summary.
+    Returns {titles, outline, meta_draft}; falls back to the separate title
+    and outline calls (with an empty draft) on failure.
     """
-    sections_text = "\n".join([
-        f"- {s['h2']}: {', '.join(s.get('key_points', []))}" 
-        for s in outline.get('sections', [])
-    ])
+    prompt = TITLES_USER_TEMPLATE.format_map({
+        'title': article['title'],
+        'summary': article['summary'],
+        'topic': article.get('classification', {}).get('primary_topic', 'Technology')
+    })
     
-    faq_text = "\n".join([
-        f"- {f['question']}" 
-        for f in outline.get('faq', [])
-    ])
+    try:
+        result = _cached_json_completion(
+            client,
+            messages=[
+                {"role": "system", "content": PLAN_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.6,
+            max_tokens=1400,
+            seed=_article_seed(article),
+            required_keys=('titles', 'outline'),
+            model=GROQ_CONFIG['outline_model'],
+            user=article['id']
+        )
+        titles = result['titles']
+        outline = result['outline']
+        
+        # Sort by score
+        titles.sort(key=lambda x: x.get('score', 0), reverse=True)
+        
+        logger.info(f"Generated {len(titles)} title options and outline with {len(outline.get('sections', []))} sections")
+        return {
+            "titles": titles,
+            "outline": outline,
+            "meta_draft": result.get('meta_draft') or {}
+        }
     
-    prompt = f"""Write a complete, engaging blog article based on this outline.
-
-TITLE: {outline['h1']}
-INTRO HOOK: {outline.get('intro_hook', '')}
+    except Exception as e:
+        logger.error(f"Plan generation error, falling back to separate calls: {e}")
+        titles = generate_seo_titles(client, article)
+        selected_title = titles[0]['title'] if titles else article['title']
+        return {
+            "titles": titles,
+            "outline": generate_outline(client, article, selected_title),
+            "meta_draft": {}
+        }
 
-SECTIONS TO COVER:
-{sections_text}
 
-FAQ TO INCLUDE:
-{faq_text}
+ARTICLE_SYSTEM_PROMPT = f"""You are a senior tech journalist writing for {SITE_NAME}. Write engaging, informative content with proper structure.
 
-SOURCE INFORMATION:
-{article['summary']}
-Source: {article['source']}
+Write a complete, engaging blog article based on the outline you are given.
 
 REQUIREMENTS:
 1. Write 1000-1500 words
@@ -248,48 +424,109 @@ REQUIREMENTS:
 7. End with a strong conclusion
 8. Include the FAQ section with full answers
 9. Cite the source appropriately
-10. Use markdown formatting
+10. Use markdown formatting"""
+
+ARTICLE_USER_TEMPLATE = """TITLE: {title}
+INTRO HOOK: {intro_hook}
+
+SECTIONS TO COVER:
+{sections}
+
+FAQ TO INCLUDE:
+{faq}
+
+SOURCE INFORMATION:
+{summary}
+Source: {source}
 
 Write the complete article now:"""
 
+
+def generate_article_content(
+    client: Groq,
+    article: Dict,
+    outline: Dict,
+    on_preview: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Generate the full article content (1000-1500 words).
+    
+    The response is streamed; once METADATA_PREVIEW_CHARS characters have
+    arrived, on_preview (if given) is called once with the text so far so
+    that dependent work can start before the article is finished.
+    """
+    sections_text = "\n".join([
+        f"- {s['h2']}: {', '.join(s.get('key_points', []))}" 
+        for s in outline.get('sections', [])
+    ])
+    
+    faq_text = "\n".join([
+        f"- {f['question']}" 
+        for f in outline.get('faq', [])
+    ])
+    
+    prompt = ARTICLE_USER_TEMPLATE.format_map({
+        'title': outline['h1'],
+        'intro_hook': outline.get('intro_hook', ''),
+        'sections': sections_text,
+        'faq': faq_text,
+        'summary': article['summary'],
+        'source': article['source']
+    })
+
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
+        response = chat_completion(
+            client,
+            model=GROQ_CONFIG['content_model'],
             messages=[
-                {"role": "system", "content": f"You are a senior tech journalist writing for {SITE_NAME}. Write engaging, informative content with proper structure."},
+                {"role": "system", "content": ARTICLE_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=GROQ_CONFIG['temperature'],
-            max_tokens=GROQ_CONFIG['max_tokens']
+            max_tokens=GROQ_CONFIG['max_tokens'],
+            user=article['id'],
+            stream=True
         )
         
-        content = response.choices[0].message.content.strip()
+        chunks = []
+        buffered = 0
+        preview_sent = on_preview is None
+        
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            chunks.append(delta)
+            buffered += len(delta)
+            
+            if not preview_sent and buffered >= METADATA_PREVIEW_CHARS:
+                on_preview("".join(chunks).lstrip())
+                preview_sent = True
+        
+        content = "".join(chunks).strip()
         
         # Add source citation if not present
         if article['source'] not in content:
             content += f"\n\n---\n*Source: [{article['source']}]({article['link']})*"
         
-        word_count = len(content.split())
-        logger.info(f"Generated article: {word_count} words")
+        logger.info(f"Generated article: {len(content)} characters")
         
         return content
         
     except Exception as e:
         logger.error(f"Article generation error: {e}")
-        return f"# {outline['h1']}\n\n{article['summary']}\n\n*Source: {article['source']}*"
+        return _summary_fallback_content(article, outline)
 
 
-def generate_seo_metadata(client: Groq, article: Dict, title: str, content: str) -> Dict:
-    """
-    Generate SEO metadata for the article.
-    """
-    prompt = f"""Generate SEO metadata for this blog article.
+def _summary_fallback_content(article: Dict, outline: Dict) -> str:
+    """Content used when the article body could not be generated."""
+    return f"# {outline['h1']}\n\n{article['summary']}\n\n*Source: {article['source']}*"
 
-TITLE: {title}
-CONTENT PREVIEW: {content[:500]}...
 
-Generate:
-{{
+METADATA_SYSTEM_PROMPT = """You are an SEO specialist.
+
+Generate SEO metadata for the blog article you are given:
+{
     "meta_title": "SEO title (50-60 chars)",
     "meta_description": "Compelling description (150-160 chars)",
     "slug": "url-friendly-slug",
@@ -298,63 +535,73 @@ Generate:
     "og_description": "Open Graph description",
     "keywords": ["keyword1", "keyword2", "keyword3", "keyword4", "keyword5"],
     "reading_time_minutes": 5
-}}
+}
 
 Only respond with JSON."""
 
+METADATA_USER_TEMPLATE = """TITLE: {title}
+CONTENT PREVIEW: {preview}"""
+
+
+def generate_seo_metadata(
+    client: Groq,
+    article: Dict,
+    title: str,
+    content: str,
+    draft: Optional[Dict] = None
+) -> Dict:
+    """
+    Generate SEO metadata for the article.
+    If the call fails, the draft from generate_plan (when given) fills in
+    the fields before falling back to values derived from the content.
+    """
+    prompt = METADATA_USER_TEMPLATE.format_map({
+        'title': title,
+        'preview': _content_preview(content)
+    })
+
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
+        metadata = _cached_json_completion(
+            client,
+            model=GROQ_CONFIG['meta_model'],
             messages=[
-                {"role": "system", "content": "You are an SEO specialist."},
+                {"role": "system", "content": METADATA_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.5,
-            max_tokens=500
+            temperature=0,
+            max_tokens=350,
+            seed=_article_seed(article),
+            user=article['id']
         )
         
-        result_text = response.choices[0].message.content.strip()
-        
-        if result_text.startswith('```'):
-            result_text = result_text.split('\n', 1)[1]
-            result_text = result_text.rsplit('```', 1)[0]
-        
-        metadata = json.loads(result_text)
-        
         # Ensure slug is properly formatted
         if 'slug' in metadata:
-            metadata['slug'] = slugify(metadata['slug'])
+            metadata['slug'] = _slug(metadata['slug'])
         else:
-            metadata['slug'] = slugify(title)
+            metadata['slug'] = _slug(title)
         
         logger.info(f"Generated SEO metadata: {metadata['slug']}")
         return metadata
         
     except Exception as e:
         logger.error(f"Metadata generation error: {e}")
-        return {
+        metadata = {
             "meta_title": title[:60],
             "meta_description": content[:160],
-            "slug": slugify(title),
+            "slug": _slug(title),
             "image_alt": f"Featured image for {title}",
             "og_title": title,
             "og_description": content[:200],
             "keywords": [],
             "reading_time_minutes": 5
         }
+        if draft:
+            metadata.update({k: v for k, v in draft.items() if k in metadata and v})
+            metadata['slug'] = _slug(metadata['slug'])
+        return metadata
 
 
-def generate_image_prompt(client: Groq, article: Dict, title: str, topic: str) -> Dict:
-    """
-    Generate a Leonardo AI-ready image prompt using Groq.
-    Returns: {prompt, filename, alt_text, confidence}
-    
-    Uses PHOTOREALISTIC style guidelines for natural, believable imagery.
-    Falls back to static prompts if confidence is low.
-    """
-    summary = article.get('summary', title)[:500]
-    
-    system_prompt = """You are an expert visual director for a tech news publication.
+IMAGE_PROMPT_SYSTEM_PROMPT = """You are an expert visual director for a tech news publication.
 Generate PHOTOREALISTIC image prompts for Leonardo AI.
 
 STRICT RULES:
@@ -373,43 +620,59 @@ Human context rules by topic:
 - Infrastructure / cyber incidents: Environment first
 - Software releases / backend tools: Device or screen focus, no people
 
+Respond with JSON:
+{
+    "prompt": "1-2 sentence Leonardo prompt",
+    "filename": "lowercase-hyphenated-filename",
+    "alt_text": "One sentence alt text with main keyword",
+    "confidence": 0.0-1.0 (how confident you are this prompt will produce a good, unique image)
+}
+
 Output JSON only."""
 
-    user_prompt = f"""Generate a Leonardo PHOTOREALISTIC image prompt for this article:
+IMAGE_PROMPT_USER_TEMPLATE = """Generate a Leonardo PHOTOREALISTIC image prompt for this article:
 
 TITLE: {title}
 TOPIC: {topic}
-SUMMARY: {summary}
+SUMMARY: {summary}"""
 
-Respond with JSON:
-{{
-    "prompt": "1-2 sentence Leonardo prompt",
-    "filename": "lowercase-hyphenated-filename",
-    "alt_text": "One sentence alt text with main keyword",
-    "confidence": 0.0-1.0 (how confident you are this prompt will produce a good, unique image)
-}}
 
-Only respond with JSON."""
+def generate_image_prompt(client: Groq, article: Dict, title: str, topic: str) -> Dict:
+    """
+    Generate a Leonardo AI-ready image prompt using Groq.
+    Returns: {prompt, filename, alt_text, confidence}
+    
+    Uses PHOTOREALISTIC style guidelines for natural, believable imagery.
+    Falls back to static prompts if confidence is low, and goes straight to
+    them for topics listed in LEONARDO_CONFIG['fallback_only_topics'].
+    """
+    if topic in LEONARDO_CONFIG.get('fallback_only_topics', ()):
+        logger.info(f"Using fallback image prompt for topic: {topic}")
+        return get_fallback_image_prompt(topic, title)
+    
+    summary = article.get('summary', title)[:500]
+    
+    user_prompt = IMAGE_PROMPT_USER_TEMPLATE.format_map({
+        'title': title,
+        'topic': topic,
+        'summary': summary
+    })
 
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
+        result = _cached_json_completion(
+            client,
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": IMAGE_PROMPT_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.7,
-            max_tokens=500
+            temperature=0,
+            max_tokens=250,
+            seed=_article_seed(article),
+            required_keys=('prompt',),
+            model=GROQ_CONFIG['meta_model'],
+            user=article['id']
         )
         
-        result_text = response.choices[0].message.content.strip()
-        
-        if result_text.startswith('```'):
-            result_text = result_text.split('\n', 1)[1]
-            result_text = result_text.rsplit('```', 1)[0]
-        
-        result = json.loads(result_text)
-        
         # Ensure confidence is a float
         result['confidence'] = float(result.get('confidence', 0.5))
         
@@ -427,69 +690,70 @@ Only respond with JSON."""
         return get_fallback_image_prompt(topic, title)
 
 
+# Multiple prompt variations per topic for variety
+_FALLBACK_PROMPTS = {
+    "AI": [
+        "Close-up of a neural network visualization on a large monitor screen, code reflected on a developer's glasses, dimly lit office, natural ambient lighting.",
+        "Medium shot of a GPU cluster cooling system in a modern data center, blue LED strip lights, industrial photography style, clean and minimal.",
+        "Wide shot of researchers discussing around a whiteboard filled with machine learning diagrams, natural window light, candid documentary photography.",
+        "Close-up of a robotic arm with precise mechanical components, factory floor background, industrial lighting, photorealistic — no sci-fi effects.",
+    ],
+    "Robotics": [
+        "Medium shot of an autonomous delivery robot navigating a sidewalk, urban environment, natural daylight, documentary photography style.",
+        "Wide shot of warehouse automation robots moving packages on conveyor systems, industrial lighting, clean perspective.",
+        "Close-up of a robotic gripper arm in a manufacturing environment, precision machinery, natural factory lighting.",
+        "Medium shot of a self-driving car's LIDAR sensors on the roof, parking lot background, overcast lighting.",
+    ],
+    "Tech Policy": [
+        "Wide shot of a government building's exterior with modern glass facade, overcast sky, documentary photography — no people.",
+        "Medium shot of a press conference room setup, empty podium with microphones, warm lighting, clean composition.",
+        "Close-up of legal documents on a desk with a laptop, natural window light, shallow depth of field.",
+        "Wide shot of a European parliament style building entrance, cloudy sky, architectural photography.",
+    ],
+    "Gaming": [
+        "Close-up of a high-end gaming keyboard with RGB lighting, hands visible in action, dimly lit room, authentic gaming setup.",
+        "Medium shot of a VR headset on a desk next to gaming controllers, natural room lighting, lifestyle photography.",
+        "Wide shot of an esports arena with multiple gaming stations, ambient purple and blue lighting, documentary style.",
+    ],
+    "Big Tech": [
+        "Wide shot of a modern glass and steel corporate campus, landscaped grounds, overcast sky, architectural photography.",
+        "Medium shot of smartphones displayed in a retail store, clean product photography, natural store lighting.",
+        "Close-up of a server rack with fiber optic cables, data center environment, subtle blue LED lighting.",
+    ],
+    "Cybersecurity": [
+        "Close-up of a lock icon on a computer screen, security dashboard in background, dim office lighting.",
+        "Medium shot of a security operations center with multiple monitors, analyst silhouette, ambient screen glow.",
+        "Wide shot of network cables connected to a firewall appliance, data center lighting, technical photography.",
+    ],
+    "Startups": [
+        "Medium shot of a small team in a modern co-working space, standing meeting around a laptop, natural daylight.",
+        "Close-up of sticky notes on a glass wall, startup brainstorming session, natural office lighting.",
+        "Wide shot of an open-plan office with bean bags and standing desks, casual atmosphere, window light.",
+    ],
+    "Cloud": [
+        "Wide shot of server racks in a modern data center, blue LED indicators, industrial lighting.",
+        "Close-up of network cables and fiber connections, data center infrastructure, technical photography.",
+        "Medium shot of cooling systems in a server room, minimal industrial aesthetic, ambient lighting.",
+    ],
+    "Default": [
+        "Medium shot of a modern tech office with employees at standing desks, large windows, natural daylight.",
+        "Close-up of a laptop on a clean desk, code on screen, minimalist workspace, soft window light.",
+        "Wide shot of a conference room with video call on a large screen, modern corporate environment.",
+    ]
+}
+
+
 def get_fallback_image_prompt(topic: str, title: str) -> Dict:
     """
     Get a fallback image prompt with multiple variations per topic for variety.
     Randomly selects from variations to avoid repetitive images.
     """
-    # Multiple prompt variations per topic for variety
-    prompt_variations = {
-        "AI": [
-            "Close-up of a neural network visualization on a large monitor screen, code reflected on a developer's glasses, dimly lit office, natural ambient lighting.",
-            "Medium shot of a GPU cluster cooling system in a modern data center, blue LED strip lights, industrial photography style, clean and minimal.",
-            "Wide shot of researchers discussing around a whiteboard filled with machine learning diagrams, natural window light, candid documentary photography.",
-            "Close-up of a robotic arm with precise mechanical components, factory floor background, industrial lighting, photorealistic — no sci-fi effects.",
-        ],
-        "Robotics": [
-            "Medium shot of an autonomous delivery robot navigating a sidewalk, urban environment, natural daylight, documentary photography style.",
-            "Wide shot of warehouse automation robots moving packages on conveyor systems, industrial lighting, clean perspective.",
-            "Close-up of a robotic gripper arm in a manufacturing environment, precision machinery, natural factory lighting.",
-            "Medium shot of a self-driving car's LIDAR sensors on the roof, parking lot background, overcast lighting.",
-        ],
-        "Tech Policy": [
-            "Wide shot of a government building's exterior with modern glass facade, overcast sky, documentary photography — no people.",
-            "Medium shot of a press conference room setup, empty podium with microphones, warm lighting, clean composition.",
-            "Close-up of legal documents on a desk with a laptop, natural window light, shallow depth of field.",
-            "Wide shot of a European parliament style building entrance, cloudy sky, architectural photography.",
-        ],
-        "Gaming": [
-            "Close-up of a high-end gaming keyboard with RGB lighting, hands visible in action, dimly lit room, authentic gaming setup.",
-            "Medium shot of a VR headset on a desk next to gaming controllers, natural room lighting, lifestyle photography.",
-            "Wide shot of an esports arena with multiple gaming stations, ambient purple and blue lighting, documentary style.",
-        ],
-        "Big Tech": [
-            "Wide shot of a modern glass and steel corporate campus, landscaped grounds, overcast sky, architectural photography.",
-            "Medium shot of smartphones displayed in a retail store, clean product photography, natural store lighting.",
-            "Close-up of a server rack with fiber optic cables, data center environment, subtle blue LED lighting.",
-        ],
-        "Cybersecurity": [
-            "Close-up of a lock icon on a computer screen, security dashboard in background, dim office lighting.",
-            "Medium shot of a security operations center with multiple monitors, analyst silhouette, ambient screen glow.",
-            "Wide shot of network cables connected to a firewall appliance, data center lighting, technical photography.",
-        ],
-        "Startups": [
-            "Medium shot of a small team in a modern co-working space, standing meeting around a laptop, natural daylight.",
-            "Close-up of sticky notes on a glass wall, startup brainstorming session, natural office lighting.",
-            "Wide shot of an open-plan office with bean bags and standing desks, casual atmosphere, window light.",
-        ],
-        "Cloud": [
-            "Wide shot of server racks in a modern data center, blue LED indicators, industrial lighting.",
-            "Close-up of network cables and fiber connections, data center infrastructure, technical photography.",
-            "Medium shot of cooling systems in a server room, minimal industrial aesthetic, ambient lighting.",
-        ],
-        "Default": [
-            "Medium shot of a modern tech office with employees at standing desks, large windows, natural daylight.",
-            "Close-up of a laptop on a clean desk, code on screen, minimalist workspace, soft window light.",
-            "Wide shot of a conference room with video call on a large screen, modern corporate environment.",
-        ]
-    }
-    
     # Get prompts for topic or use default
-    topic_prompts = prompt_variations.get(topic, prompt_variations["Default"])
+    topic_prompts = _FALLBACK_PROMPTS.get(topic, _FALLBACK_PROMPTS["Default"])
     selected_prompt = random.choice(topic_prompts)
     
     # Customize filename with title keywords
-    slug_title = slugify(title)[:30]
+    slug_title = _slug(title)[:30]
     
     return {
         "prompt": selected_prompt,
@@ -500,9 +764,62 @@ def get_fallback_image_prompt(topic: str, title: str) -> Dict:
     }
 
 
-def generate_full_article(article: Dict) -> Optional[Dict]:
+def find_covering_article(article: Dict) -> Optional[Dict]:
+    """
+    Look for a recently generated article covering the same story (a
+    near-duplicate title + summary from another source).
+    Returns {id, slug} of that article, or None.
+    """
+    match = get_similar(
+        "generated_article",
+        f"{article['title']} {article['summary']}",
+        ARTICLE_CONFIG['cache_threshold'],
+        ARTICLE_CONFIG['cache_max_age_hours'] * 3600,
+        exclude_key=article['id']
+    )
+    if match is None:
+        return None
+    
+    score, value = match
+    covering = orjson.loads(value)
+    logger.info(f"Similar story already generated ({score:.2f}): {covering['slug']}")
+    return covering
+
+
+def _remember_generated_article(article: Dict, generated: Dict) -> None:
+    """Store a generated article's id and slug for near-duplicate lookups."""
+    set_similar(
+        "generated_article",
+        article['id'],
+        f"{article['title']} {article['summary']}",
+        orjson.dumps({"id": generated['id'], "slug": generated['metadata']['slug']}).decode()
+    )
+
+
+def _render_featured_image(article: Dict, title: str, image_future) -> Dict:
+    """
+    Render the featured image once the image prompt is ready. Runs next to
+    the body generation, so it only sees the fields the prompt step needs.
+    """
+    stub = {
+        "id": article['id'],
+        "title": title,
+        "classification": article.get('classification', {}),
+        "metadata": {"slug": _slug(title)},
+        "image_prompt": image_future.result()
+    }
+    try:
+        return generate_featured_image(stub)
+    except Exception as e:
+        logger.error(f"Error generating image for {article['id']}: {e}")
+        return create_placeholder_result(stub)
+
+
+def generate_full_article(article: Dict, with_image: bool = False) -> Optional[Dict]:
     """
     Main function: Generate a complete article with all components.
+    With with_image, the featured image is rendered while the body is
+    written and attached as 'featured_image'.
     """
     client = get_groq_client()
     
@@ -512,22 +829,47 @@ def generate_full_article(article: Dict) -> Optional[Dict]:
     
     logger.info(f"Generating article for: {article['title'][:50]}...")
     
-    # Step 1: Generate SEO titles
-    titles = generate_seo_titles(client, article)
+    # Step 1: Plan the article (SEO titles, outline and metadata draft)
+    plan = generate_plan(client, article)
+    titles = plan['titles']
+    outline = plan['outline']
     selected_title = titles[0]['title'] if titles else article['title']
     
-    # Step 2: Generate outline
-    outline = generate_outline(client, article, selected_title)
-    
-    # Step 3: Generate content
-    content = generate_article_content(client, article, outline)
+    topic = article.get('classification', {}).get('primary_topic', 'Technology')
     
-    # Step 4: Generate SEO metadata
-    metadata = generate_seo_metadata(client, article, selected_title, content)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        # Step 2: Generate image prompt (only needs the title, so it runs
+        # alongside the content -> metadata chain)
+        image_future = executor.submit(generate_image_prompt, client, article, selected_title, topic)
+        
+        # The image only depends on the prompt, so Leonardo renders it
+        # while the body is still being written
+        featured_future = None
+        if with_image:
+            featured_future = executor.submit(_render_featured_image, article, selected_title, image_future)
+        
+        # Step 3: Generate content. SEO metadata (step 4) only needs the
+        # opening of the article, so it starts as soon as that has streamed in
+        metadata_futures = []
+        
+        def start_metadata(preview: str):
+            metadata_futures.append(
+                executor.submit(generate_seo_metadata, client, article, selected_title, preview, plan['meta_draft'])
+            )
+        
+        content = generate_article_content(client, article, outline, on_preview=start_metadata)
+        
+        # Step 4: Generate SEO metadata (short articles never trigger the preview)
+        if metadata_futures:
+            metadata = metadata_futures[0].result()
+        else:
+            metadata = generate_seo_metadata(client, article, selected_title, content, plan['meta_draft'])
+        
+        image_prompt_data = image_future.result()
+        featured_image = featured_future.result() if featured_future else None
     
-    # Step 5: Generate image prompt (NEW - hybrid Groq + fallback)
-    topic = article.get('classification', {}).get('primary_topic', 'Technology')
-    image_prompt_data = generate_image_prompt(client, article, selected_title, topic)
+    word_count = len(content.split())
+    logger.info(f"Article word count: {word_count}")
     
     # Compile final article
     generated_article = {
@@ -542,14 +884,54 @@ def generate_full_article(article: Dict) -> Optional[Dict]:
         "metadata": metadata,
         "classification": article.get('classification', {}),
         "generated_at": datetime.now(timezone.utc).isoformat(),
-        "word_count": len(content.split()),
+        "word_count": word_count,
         "image_prompt": image_prompt_data  # NEW: Contains prompt, filename, alt_text, confidence, source
     }
+    if featured_image:
+        generated_article['featured_image'] = featured_image
     
     logger.info(f"Article generation complete: {metadata['slug']} (image prompt source: {image_prompt_data.get('source', 'unknown')})")
+    
+    # Only a fully written article may stand in for later near-duplicates
+    if content != _summary_fallback_content(article, outline):
+        _remember_generated_article(article, generated_article)
     return generated_article
 
 
+def generate_articles_batch(
+    articles: List[Dict],
+    concurrency: int = None,
+    with_images: bool = False
+) -> List[Optional[Dict]]:
+    """
+    Generate several articles concurrently.
+    Results keep the input order; articles that failed to generate are None.
+    With with_images, each article's featured image is rendered alongside it.
+    """
+    if concurrency is None:
+        concurrency = GROQ_CONFIG['max_concurrency']
+    
+    if not articles:
+        return []
+    
+    results = [None] * len(articles)
+    
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(articles))) as executor:
+        future_to_index = {
+            executor.submit(generate_full_article, article, with_images): i
+            for i, article in enumerate(articles)
+        }
+        
+        for future in as_completed(future_to_index):
+            i = future_to_index[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.error(f"Error generating article {articles[i]['id']}: {e}")
+    
+    return results
+
+
 if __name__ == "__main__":
     # Test the generator
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,191 @@
+"""
+Auto News Pipeline - Response Cache
+SQLite-backed key/value store used to skip repeated API calls across runs.
+"""
+
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+CACHE_DB = CACHE_DIR / "cache.db"
+
+# In-process LRU in front of the database
+MEMORY_CACHE_SIZE = 1024
+
+_lock = threading.Lock()
+_connection: Optional[sqlite3.Connection] = None
+_memory: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with",
+    "is", "are", "was", "its", "it", "as", "at", "by", "from", "that", "this"
+})
+
+
+def _get_connection() -> sqlite3.Connection:
+    """Open the cache database on first use."""
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(CACHE_DB, check_same_thread=False)
+        # WAL + NORMAL sync: each write is one small commit, and a crash can
+        # lose at most the last few cache entries
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+    return _connection
+
+
+def _remember(namespace: str, key: str, value: str, created_at: float) -> None:
+    """Store a value in the in-process LRU."""
+    _memory[(namespace, key)] = (value, created_at)
+    _memory.move_to_end((namespace, key))
+    if len(_memory) > MEMORY_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def get_cached(namespace: str, key: str, max_age: Optional[float] = None) -> Optional[str]:
+    """
+    Return the cached value for a key, or None on a miss. With max_age,
+    entries stored more than that many seconds ago count as misses.
+    """
+    oldest = time.time() - max_age if max_age is not None else 0.0
+    with _lock:
+        if (namespace, key) in _memory:
+            value, created_at = _memory[(namespace, key)]
+            if created_at < oldest:
+                return None
+            _memory.move_to_end((namespace, key))
+            return value
+        
+        try:
+            row = _get_connection().execute(
+                "SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed: {e}")
+            return None
+        
+        if row is None or row[1] < oldest:
+            return None
+        
+        _remember(namespace, key, row[0], row[1])
+        return row[0]
+
+
+def set_cached(namespace: str, key: str, value: str) -> None:
+    """Store a value in the cache."""
+    created_at = time.time()
+    with _lock:
+        _remember(namespace, key, value, created_at)
+        try:
+            connection = _get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, created_at)
+            )
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed: {e}")
+
+
+def get_recent(namespace: str, max_age: float) -> List[Tuple[str, str]]:
+    """Return (key, value) pairs stored in a namespace within the last max_age seconds."""
+    with _lock:
+        try:
+            return _get_connection().execute(
+                "SELECT key, value FROM entries WHERE namespace = ? AND created_at >= ?",
+                (namespace, time.time() - max_age)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed: {e}")
+            return []
+
+
+def _term_vector(text: str) -> Dict[str, float]:
+    """Unit-length word-count vector for similarity comparisons."""
+    counts = Counter(w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS)
+    norm = math.sqrt(sum(c * c for c in counts.values()))
+    return {w: c / norm for w, c in counts.items()} if norm else {}
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Cosine similarity of two unit-length term vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(w, 0.0) for w, v in a.items())
+
+
+def load_similar(namespace: str, max_age: float) -> List[Tuple[str, Dict[str, float], str]]:
+    """
+    Read the entries stored with set_similar within the last max_age seconds,
+    as (key, term vector, value). Load once and pass to best_similar when
+    comparing many texts against the same namespace.
+    """
+    entries = []
+    for key, stored in get_recent(namespace, max_age):
+        entry = json.loads(stored)
+        if 'value' in entry:
+            entries.append((key, entry['vector'], entry['value']))
+    return entries
+
+
+def best_similar(
+    entries: List[Tuple[str, Dict[str, float], str]],
+    text: str,
+    threshold: float,
+    exclude_key: Optional[str] = None
+) -> Optional[Tuple[float, str]]:
+    """
+    Find the entry (from load_similar) whose source text is most like this
+    one (cosine over word counts). Returns (score, value) when the best
+    match reaches threshold, otherwise None. The entry stored under
+    exclude_key (e.g. the item itself) is never matched.
+    """
+    vector = _term_vector(text)
+    if not vector:
+        return None
+    
+    best_score = 0.0
+    best_value = None
+    for key, entry_vector, value in entries:
+        if key == exclude_key:
+            continue
+        score = _cosine(vector, entry_vector)
+        if score > best_score:
+            best_score, best_value = score, value
+    
+    if best_value is None or best_score < threshold:
+        return None
+    return best_score, best_value
+
+
+def get_similar(
+    namespace: str,
+    text: str,
+    threshold: float,
+    max_age: float,
+    exclude_key: Optional[str] = None
+) -> Optional[Tuple[float, str]]:
+    """Look up a single text against a namespace (see best_similar)."""
+    return best_similar(load_similar(namespace, max_age), text, threshold, exclude_key)
+
+
+def set_similar(namespace: str, key: str, text: str, value: str) -> None:
+    """Store a value for similarity lookups on its source text."""
+    set_cached(namespace, key, json.dumps({"vector": _term_vector(text), "value": value}))
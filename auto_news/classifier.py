@@ -3,77 +3,174 @@ Auto News Pipeline - AI Classifier
 Uses Groq to classify articles by relevance to target topics.
 """
 
-import logging
-from typing import List, Dict, Optional
-from groq import Groq
+from __future__ import annotations
 
-from .config import GROQ_API_KEY, GROQ_CONFIG, TARGET_TOPICS, TOPIC_CATEGORIES, ARTICLE_CONFIG
+import logging
+import time
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Optional
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from groq import Groq
 
+from .config import (
+    GROQ_CONFIG, TARGET_TOPICS, TOPIC_CATEGORIES, TOPIC_CATEGORIES_LC, ARTICLE_CONFIG, CACHE_DIR
+)
+from .cache import load_similar, best_similar, set_similar
+from .groq_client import get_groq_client, chat_completion, parse_json_reply
 
-def get_groq_client() -> Optional[Groq]:
-    """Initialize Groq client."""
-    if not GROQ_API_KEY:
-        logger.warning("GROQ_API_KEY not set. Classification will be skipped.")
-        return None
-    return Groq(api_key=GROQ_API_KEY)
+logger = logging.getLogger(__name__)
 
+# Keyword fallback table in TOPIC_CATEGORIES order, pairing each keyword
+# with its lowercased form: (topic, keyword, lowercased keyword)
+FALLBACK_KEYWORDS = tuple(
+    (topic, keyword, keyword_lc)
+    for topic, keywords in TOPIC_CATEGORIES.items()
+    for keyword, keyword_lc in zip(keywords, TOPIC_CATEGORIES_LC[topic])
+)
 
-def classify_article(client: Groq, article: Dict) -> Dict:
-    """
-    Classify a single article for relevance to AI/Robotics/Tech Policy.
-    Returns the article with added classification data.
-    """
-    prompt = f"""Analyze this news article and determine its relevance to our target topics.
 
-ARTICLE TITLE: {article['title']}
+# Static instructions live in the system messages so that every classifier
+# request starts with the same prefix; only the article fields are filled
+# into the user message
+CLASSIFY_SYSTEM_PROMPT = """You are a news classifier. Respond only with valid JSON.
 
-ARTICLE SUMMARY: {article['summary']}
+Analyze the news article and determine its relevance to our target topics.
 
 TARGET TOPICS: AI, Machine Learning, Robotics, Automation, Tech Policy, Regulation
 
 Respond in this exact JSON format:
-{{
+{
     "relevant": true/false,
     "relevance_score": 0-100,
     "primary_topic": "AI" or "Robotics" or "Tech Policy" or "Other",
     "keywords": ["keyword1", "keyword2", "keyword3"],
     "reason": "Brief explanation of why this article is or isn't relevant"
-}}
+}
+
+Only respond with the JSON, no other text."""
+
+CLASSIFY_USER_TEMPLATE = """ARTICLE TITLE: {title}
+
+ARTICLE SUMMARY: {summary}"""
+
+GROUP_CLASSIFY_SYSTEM_PROMPT = """You are a news classifier. Respond only with valid JSON.
+
+Analyze the numbered news articles and determine each one's relevance to our target topics.
+
+TARGET TOPICS: AI, Machine Learning, Robotics, Automation, Tech Policy, Regulation
+
+Respond in this exact JSON format, with one result per article:
+{
+    "results": [
+        {
+            "index": 1,
+            "relevant": true/false,
+            "relevance_score": 0-100,
+            "primary_topic": "AI" or "Robotics" or "Tech Policy" or "Other",
+            "keywords": ["keyword1", "keyword2", "keyword3"],
+            "reason": "Brief explanation of why this article is or isn't relevant"
+        },
+        ...
+    ]
+}
 
 Only respond with the JSON, no other text."""
 
+GROUP_CLASSIFY_ENTRY_TEMPLATE = """ARTICLE {index}
+TITLE: {title}
+SUMMARY: {summary}"""
+
+
+def _classification_messages(article: Dict) -> List[Dict]:
+    """Build the chat messages used to classify one article."""
+    return [
+        {"role": "system", "content": CLASSIFY_SYSTEM_PROMPT},
+        {"role": "user", "content": CLASSIFY_USER_TEMPLATE.format_map(article)}
+    ]
+
+
+def _set_classification(article: Dict, classification: Dict) -> Dict:
+    """Attach a parsed classifier result to the article."""
+    article['classification'] = {
+        'relevant': classification.get('relevant', False),
+        'relevance_score': classification.get('relevance_score', 0),
+        'primary_topic': classification.get('primary_topic', 'Other'),
+        'keywords': classification.get('keywords', []),
+        'reason': classification.get('reason', '')
+    }
+    return article
+
+
+def _apply_classification(article: Dict, result_text: str) -> Dict:
+    """Parse a classifier reply and attach it to the article."""
+    return _set_classification(article, parse_json_reply(result_text.strip()))
+
+
+def _load_recent_classifications() -> List:
+    """Read the recent classifications once, for checking a whole batch of articles."""
+    return load_similar("classification", ARTICLE_CONFIG['cache_max_age_hours'] * 3600)
+
+
+def _reuse_similar_classification(article: Dict, recent: Optional[List] = None) -> bool:
+    """
+    Copy the classification of a recent near-duplicate story, if any.
+    recent is the result of _load_recent_classifications (read here if not given).
+    """
+    if recent is None:
+        recent = _load_recent_classifications()
+    match = best_similar(
+        recent,
+        f"{article['title']} {article['summary']}",
+        ARTICLE_CONFIG['cache_threshold']
+    )
+    if match is None:
+        return False
+    
+    article['classification'] = orjson.loads(match[1])
+    logger.info(f"Reused classification ({match[0]:.2f}): {article['title'][:50]}...")
+    return True
+
+
+def _remember_classification(article: Dict) -> None:
+    """Store a successful classification for near-duplicate lookups (keyed by article id)."""
+    if not article.get('id'):
+        return
+    set_similar(
+        "classification",
+        article['id'],
+        f"{article['title']} {article['summary']}",
+        orjson.dumps(article['classification']).decode()
+    )
+
+
+def classify_article(client: Groq, article: Dict, recent: Optional[List] = None) -> Dict:
+    """
+    Classify a single article for relevance to AI/Robotics/Tech Policy.
+    Returns the article with added classification data.
+    Near-duplicates of recently classified stories reuse that result.
+    """
+    if _reuse_similar_classification(article, recent):
+        return article
+    
+    request = {
+        "model": GROQ_CONFIG['classify_model'],
+        "messages": _classification_messages(article),
+        "temperature": 0.3,
+        "max_tokens": 500,
+        "response_format": {"type": "json_object"}
+    }
+    # Tag the request with the article id when there is one
+    if article.get('id'):
+        request["user"] = article['id']
+    
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
-            messages=[
-                {"role": "system", "content": "You are a news classifier. Respond only with valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Parse JSON response
-        import json
-        # Clean up potential markdown formatting
-        if result_text.startswith('```'):
-            result_text = result_text.split('\n', 1)[1]
-            result_text = result_text.rsplit('```', 1)[0]
+        response = chat_completion(client, **request)
         
-        classification = json.loads(result_text)
-        
-        # Add classification to article
-        article['classification'] = {
-            'relevant': classification.get('relevant', False),
-            'relevance_score': classification.get('relevance_score', 0),
-            'primary_topic': classification.get('primary_topic', 'Other'),
-            'keywords': classification.get('keywords', []),
-            'reason': classification.get('reason', '')
-        }
+        _apply_classification(article, response.choices[0].message.content)
+        _remember_classification(article)
         
         logger.info(f"Classified: {article['title'][:50]}... -> Score: {article['classification']['relevance_score']}")
         
@@ -90,6 +187,185 @@ Only respond with the JSON, no other text."""
     return article
 
 
+def _group_classification_messages(articles: List[Dict]) -> List[Dict]:
+    """Build the chat messages used to classify several articles at once."""
+    listing = "\n\n".join(
+        GROUP_CLASSIFY_ENTRY_TEMPLATE.format(index=i, title=article['title'], summary=article['summary'])
+        for i, article in enumerate(articles, 1)
+    )
+    
+    return [
+        {"role": "system", "content": GROUP_CLASSIFY_SYSTEM_PROMPT},
+        {"role": "user", "content": listing}
+    ]
+
+
+def _classify_group(client: Groq, articles: List[Dict]) -> List[Dict]:
+    """
+    Classify several articles with a single request.
+    Returns the articles that did not get a result back.
+    """
+    try:
+        response = chat_completion(
+            client,
+            model=GROQ_CONFIG['classify_model'],
+            messages=_group_classification_messages(articles),
+            temperature=0.3,
+            max_tokens=150 * len(articles) + 100,
+            response_format={"type": "json_object"}
+        )
+        results = parse_json_reply(response.choices[0].message.content.strip()).get('results', [])
+    except Exception as e:
+        logger.error(f"Grouped classification error: {e}")
+        return articles
+    
+    by_index = {r.get('index'): r for r in results if isinstance(r, dict)}
+    missing = []
+    for i, article in enumerate(articles, 1):
+        if i not in by_index:
+            missing.append(article)
+            continue
+        _set_classification(article, by_index[i])
+        _remember_classification(article)
+        logger.info(f"Classified: {article['title'][:50]}... -> Score: {article['classification']['relevance_score']}")
+    
+    return missing
+
+
+def classify_articles_batched(client: Groq, articles: List[Dict], batch: int = None) -> List[Dict]:
+    """
+    Classify articles several per request (ARTICLE_CONFIG['classify_batch_size']),
+    with the requests running concurrently. Articles missing from a reply
+    are classified individually.
+    """
+    if batch is None:
+        batch = ARTICLE_CONFIG['classify_batch_size']
+    
+    recent = _load_recent_classifications()
+    pending = [a for a in articles if not _reuse_similar_classification(a, recent)]
+    groups = [pending[i:i + batch] for i in range(0, len(pending), batch)]
+    if not groups:
+        return articles
+    
+    with ThreadPoolExecutor(max_workers=min(GROQ_CONFIG['max_concurrency'], len(groups))) as executor:
+        leftovers = [a for missing in executor.map(lambda g: _classify_group(client, g), groups) for a in missing]
+        list(executor.map(lambda article: classify_article(client, article, recent), leftovers))
+    
+    return articles
+
+
+def build_classification_jsonl(articles: List[Dict], path: Path = None) -> Path:
+    """
+    Write one Batch API request per article to a JSONL file.
+    The article id is used as custom_id to match results back.
+    """
+    if path is None:
+        path = CACHE_DIR / "classification_batch.jsonl"
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        for article in articles:
+            request = {
+                "custom_id": article['id'],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": GROQ_CONFIG['classify_model'],
+                    "messages": _classification_messages(article),
+                    "temperature": 0.3,
+                    "max_tokens": 500,
+                    "response_format": {"type": "json_object"}
+                }
+            }
+            f.write(orjson.dumps(request).decode() + "\n")
+    
+    return path
+
+
+def submit_batch(client: Groq, path: Path) -> str:
+    """Upload a request file and start a batch job. Returns the batch id."""
+    with open(path, 'rb') as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted classification batch {batch.id}")
+    return batch.id
+
+
+def poll_batch(client: Groq, batch_id: str) -> Dict[str, str]:
+    """
+    Wait for a batch job to finish (up to ARTICLE_CONFIG['batch_timeout']
+    seconds). Returns reply text by custom_id; empty if the batch did not
+    complete in time.
+    """
+    deadline = time.monotonic() + ARTICLE_CONFIG['batch_timeout']
+    
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            break
+        if batch.status in ("failed", "expired", "cancelled") or time.monotonic() >= deadline:
+            logger.warning(f"Classification batch {batch_id} not completed (status: {batch.status})")
+            return {}
+        time.sleep(ARTICLE_CONFIG['batch_poll_interval'])
+    
+    if not batch.output_file_id:
+        return {}
+    
+    replies = {}
+    output = client.files.content(batch.output_file_id).text()
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = orjson.loads(line)
+        body = (result.get('response') or {}).get('body') or {}
+        choices = body.get('choices') or []
+        if choices:
+            replies[result['custom_id']] = choices[0]['message']['content']
+    
+    return replies
+
+
+def classify_articles_batch(client: Groq, articles: List[Dict]) -> List[Dict]:
+    """
+    Classify articles through the Groq Batch API (cheaper, not real-time).
+    Near-duplicates of recently classified stories reuse that result; articles
+    without a batch result are classified with regular calls.
+    """
+    recent = _load_recent_classifications()
+    to_submit = [a for a in articles if not _reuse_similar_classification(a, recent)]
+    if not to_submit:
+        return articles
+    
+    try:
+        batch_id = submit_batch(client, build_classification_jsonl(to_submit))
+        replies = poll_batch(client, batch_id)
+    except Exception as e:
+        logger.error(f"Batch classification error: {e}")
+        replies = {}
+    
+    pending = []
+    for article in to_submit:
+        reply = replies.get(article['id'])
+        try:
+            if reply is None:
+                raise ValueError("no batch result")
+            _apply_classification(article, reply)
+            _remember_classification(article)
+        except Exception as e:
+            logger.warning(f"Batch result unusable for {article['title'][:50]}: {e}")
+            pending.append(article)
+    
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(GROQ_CONFIG['max_concurrency'], len(pending))) as executor:
+            list(executor.map(lambda article: classify_article(client, article, recent), pending))
+    
+    return articles
+
+
 def classify_articles(articles: List[Dict]) -> List[Dict]:
     """
     Classify all articles and filter to relevant ones.
@@ -100,10 +376,21 @@ def classify_articles(articles: List[Dict]) -> List[Dict]:
         logger.warning("No Groq client. Using keyword-based fallback classification.")
         return keyword_fallback_classify(articles)
     
-    classified = []
-    for article in articles:
-        classified_article = classify_article(client, article)
-        classified.append(classified_article)
+    if not articles:
+        return []
+    
+    if ARTICLE_CONFIG['batch_mode']:
+        return classify_articles_batch(client, articles)
+    
+    if ARTICLE_CONFIG['classify_batch_size'] > 1:
+        return classify_articles_batched(client, articles)
+    
+    # Each classification is an independent, network-bound call, so fan
+    # them out (map keeps the input order)
+    recent = _load_recent_classifications()
+    workers = min(GROQ_CONFIG['max_concurrency'], len(articles))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        classified = list(executor.map(lambda article: classify_article(client, article, recent), articles))
     
     return classified
 
@@ -115,21 +402,15 @@ def keyword_fallback_classify(articles: List[Dict]) -> List[Dict]:
     for article in articles:
         text = f"{article['title']} {article['summary']}".lower()
         
-        score = 0
-        matched_keywords = []
-        primary_topic = "Other"
-        
         # Check for topic keywords
-        for topic, keywords in TOPIC_CATEGORIES.items():
-            for keyword in keywords:
-                if keyword.lower() in text:
-                    score += 15
-                    matched_keywords.append(keyword)
-                    if primary_topic == "Other":
-                        primary_topic = topic
+        matches = [(topic, keyword) for topic, keyword, keyword_lc in FALLBACK_KEYWORDS if keyword_lc in text]
+        matched_keywords = [keyword for _, keyword in matches]
+        
+        # 15 points per keyword, capped at 100
+        score = min(len(matches) * 15, 100)
         
-        # Cap score at 100
-        score = min(score, 100)
+        # The first matching topic (in TOPIC_CATEGORIES order) is primary
+        primary_topic = matches[0][0] if matches else "Other"
         
         article['classification'] = {
             'relevant': score >= ARTICLE_CONFIG['min_relevance_score'],
@@ -5,10 +5,13 @@ Central configuration for RSS feeds, API settings, and site config.
 
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+from types import MappingProxyType
 
-# Load environment variables
-load_dotenv()
+# Load environment variables from .env for local runs; scheduled runs set
+# PIPELINE_RUNTIME and get their environment from the runner instead
+if not os.getenv("PIPELINE_RUNTIME"):
+    from dotenv import load_dotenv
+    load_dotenv()
 
 # =============================================================================
 # PATHS
@@ -19,11 +22,13 @@ ARTICLES_DIR = SITE_DIR / "articles"
 ASSETS_DIR = SITE_DIR / "assets"
 DATA_DIR = BASE_DIR / "data"
 IMAGES_DIR = DATA_DIR / "generated_images"
+CACHE_DIR = DATA_DIR / "cache"
 
 # Create directories if they don't exist
 ARTICLES_DIR.mkdir(parents=True, exist_ok=True)
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 # =============================================================================
 # API KEYS
@@ -147,6 +152,13 @@ TOPIC_CATEGORIES = {
     ]
 }
 
+# Lowercased keywords per topic (same order as TOPIC_CATEGORIES), built once
+# at import (read-only so they can be cached safely by consumers)
+TOPIC_CATEGORIES_LC = MappingProxyType({
+    topic: tuple(k.lower() for k in keywords)
+    for topic, keywords in TOPIC_CATEGORIES.items()
+})
+
 # =============================================================================
 # ARTICLE GENERATION SETTINGS
 # =============================================================================
@@ -155,7 +167,16 @@ ARTICLE_CONFIG = {
     "max_words": 1500,
     "min_relevance_score": 70,  # 0-100 scale
     "articles_per_run": 2,
-    "hours_lookback": 24
+    "hours_lookback": 24,
+    "batch_mode": False,  # Classify via the Groq Batch API instead of per-article calls
+    "batch_timeout": 1800,  # Seconds to wait for a classification batch
+    "batch_poll_interval": 30,  # Seconds between batch status checks
+    "classify_batch_size": 8,  # Articles classified per Groq request (1 = one request each)
+    "event_batch_size": 20,  # Articles event-classified per Groq request (1 = one request each)
+    # Near-duplicate stories (same event from another feed) reuse earlier
+    # classifications/articles when their title + summary is this similar
+    "cache_threshold": 0.85,  # Cosine similarity, 0-1
+    "cache_max_age_hours": 48
 }
 
 # =============================================================================
@@ -163,8 +184,19 @@ ARTICLE_CONFIG = {
 # =============================================================================
 GROQ_CONFIG = {
     "model": "llama-3.3-70b-versatile",
+    # Per-stage models: the short structured-JSON stages run on the small,
+    # faster model; the large model is kept for planning and article text
+    "classify_model": "llama-3.1-8b-instant",
+    "title_model": "llama-3.1-8b-instant",
+    "outline_model": "llama-3.3-70b-versatile",
+    "content_model": "llama-3.3-70b-versatile",
+    "meta_model": "llama-3.1-8b-instant",
     "temperature": 0.7,
-    "max_tokens": 4096
+    "max_tokens": 4096,
+    "max_concurrency": 4,  # Articles generated in parallel (keep within rate limits)
+    # Groq requests in flight at once across all threads. Roughly
+    # requests-per-minute / 60 * average latency (s), minus ~30% headroom
+    "max_in_flight_requests": 6
 }
 
 # =============================================================================
@@ -174,7 +206,15 @@ LEONARDO_CONFIG = {
     "model_id": "de7d3faf-762f-48e0-b3b7-9d0ac3a3fcf3",  # Leonardo Phoenix 1.0
     "width": 1472,   # Must be multiple of 8, close to 16:9 for OG images
     "height": 832,   # Must be multiple of 8
-    "num_images": 1
+    "num_images": 1,
+    "max_concurrency": 4,  # Images generated in parallel (keep within Leonardo's limits)
+    # Generation status polling: the wait starts here and grows 1.5x per poll
+    "poll_initial_delay": 1.0,  # Seconds
+    "poll_max_delay": 8.0,  # Seconds
+    "image_cache_max_age_days": 7,  # Reuse generated images for identical prompts this long
+    # Topics whose static fallback prompts fit well enough that the Groq
+    # image prompt call is skipped entirely
+    "fallback_only_topics": ["Cloud", "Cybersecurity", "Big Tech", "Tech Policy"]
 }
 
 # =============================================================================
@@ -4,11 +4,22 @@ Classifies news articles by event type to prioritize breaking news over routine
 Uses Groq for fast, intelligent classification.
 """
 
+from __future__ import annotations
+
+import hashlib
 import logging
-from typing import Dict, Optional, List
-from groq import Groq
+import orjson
+import re
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Optional, List
+
+if TYPE_CHECKING:
+    from groq import Groq
 
-from .config import GROQ_API_KEY, GROQ_CONFIG
+from .config import GROQ_CONFIG, ARTICLE_CONFIG
+from .cache import get_cached, set_cached
+from .groq_client import get_groq_client, chat_completion, parse_json_reply
 
 logger = logging.getLogger(__name__)
 
@@ -60,13 +71,19 @@ HIGH_PROFILE_ENTITIES = [
     "claude", "waymo", "x.ai", "deepmind", "stability ai", "midjourney"
 ]
 
+# Whole-word patterns for deciding when keywords alone are enough to skip
+# Groq (plain substring checks also match "ships" in "partnerships", "ban"
+# in "bank", "meta" in "metadata")
+SIGNAL_WORD_PATTERNS = {
+    event_type: [re.compile(rf"\b{re.escape(keyword)}\b") for keyword in keywords]
+    for event_type, keywords in EVENT_SIGNALS.items()
+}
+HIGH_PROFILE_WORD_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(entity) for entity in HIGH_PROFILE_ENTITIES) + r")\b"
+)
 
-def get_groq_client() -> Optional[Groq]:
-    """Initialize Groq client."""
-    if not GROQ_API_KEY:
-        logger.warning("GROQ_API_KEY not set.")
-        return None
-    return Groq(api_key=GROQ_API_KEY)
+# Categories that need at least two whole-word signal keywords to skip Groq
+MULTI_SIGNAL_EVENTS = frozenset({"BREAKING", "ACQUISITION", "LAYOFFS"})
 
 
 def classify_event_fast(title: str, summary: str = "") -> Dict:
@@ -86,7 +103,9 @@ def classify_event_fast(title: str, summary: str = "") -> Dict:
                 "event_type": event_type,
                 "priority": EVENT_PRIORITY[event_type],
                 "confidence": "keyword_match",
-                "high_profile": has_high_profile
+                "high_profile": has_high_profile,
+                "keyword_hits": sum(1 for pattern in SIGNAL_WORD_PATTERNS[event_type] if pattern.search(text)),
+                "high_profile_word": HIGH_PROFILE_WORD_PATTERN.search(text) is not None
             }
     
     # Default to routine
@@ -98,15 +117,11 @@ def classify_event_fast(title: str, summary: str = "") -> Dict:
     }
 
 
-def classify_event_groq(client: Groq, title: str, summary: str = "") -> Dict:
-    """
-    Use Groq for intelligent event classification.
-    More accurate but slightly slower than keyword matching.
-    """
-    # First do fast classification for hint
-    fast_result = classify_event_fast(title, summary)
-    
-    prompt = f"""Classify this news article into exactly ONE category.
+# Static instructions live in the system message so that every event request
+# starts with the same prefix; only the title and summary vary
+EVENT_SYSTEM_PROMPT = """You are a news editor who identifies breaking news that will drive search traffic.
+
+Classify the news article into exactly ONE category.
 
 Categories:
 - BREAKING: New product launches, model releases, feature announcements, things people will Google TODAY
@@ -117,20 +132,80 @@ Categories:
 - VIRAL: Trending on social media, generating buzz
 - ROUTINE: Regular updates, opinion pieces, minor features, not time-sensitive
 
-TITLE: {title}
-SUMMARY: {summary[:300] if summary else 'N/A'}
-
 Think: "Will people start Googling this within the next few hours?"
 If yes → BREAKING, ACQUISITION, LAYOFFS, LAWSUIT, or FUNDING
 If no → ROUTINE
 
 Reply with ONLY the category name (one word)."""
 
+EVENT_USER_TEMPLATE = """TITLE: {title}
+SUMMARY: {summary}"""
+
+EVENT_BATCH_SYSTEM_PROMPT = """You are a news editor who identifies breaking news that will drive search traffic.
+
+Classify each of the numbered news articles into exactly ONE category.
+
+Categories:
+- BREAKING: New product launches, model releases, feature announcements, things people will Google TODAY
+- ACQUISITION: Company buys/acquires another company
+- LAYOFFS: Job cuts, workforce reductions, restructuring
+- LAWSUIT: Legal action, bans, investigations, court rulings
+- FUNDING: Investment rounds, valuations (only if >$50M or well-known company)
+- VIRAL: Trending on social media, generating buzz
+- ROUTINE: Regular updates, opinion pieces, minor features, not time-sensitive
+
+Think: "Will people start Googling this within the next few hours?"
+If yes → BREAKING, ACQUISITION, LAYOFFS, LAWSUIT, or FUNDING
+If no → ROUTINE
+
+Respond in this exact JSON format, with one result per article:
+{"results": [{"index": 1, "category": "BREAKING"}, ...]}"""
+
+EVENT_BATCH_ENTRY_TEMPLATE = """ARTICLE {index}
+TITLE: {title}
+SUMMARY: {summary}"""
+
+
+def decisive_keyword_result(fast_result: Dict) -> Optional[Dict]:
+    """
+    The keyword classification, if it is strong enough to skip Groq: a
+    high-profile entity plus a signal keyword, both as whole words.
+    BREAKING/ACQUISITION/LAYOFFS need at least two signal keywords.
+    """
+    if fast_result["confidence"] != "keyword_match":
+        return None
+    
+    min_hits = 2 if fast_result["event_type"] in MULTI_SIGNAL_EVENTS else 1
+    if fast_result["high_profile_word"] and fast_result["keyword_hits"] >= min_hits:
+        return {**fast_result, "confidence": "keyword_high_confidence"}
+    return None
+
+
+def classify_event_groq(client: Groq, title: str, summary: str = "") -> Dict:
+    """
+    Use Groq for intelligent event classification.
+    More accurate but slightly slower than keyword matching.
+    """
+    # First do fast classification for hint
+    fast_result = classify_event_fast(title, summary)
+    
+    # Clear-cut keyword matches don't need Groq
+    decisive = decisive_keyword_result(fast_result)
+    if decisive:
+        logger.info(f"Keyword match is decisive, skipping Groq: {title[:40]}... → {decisive['event_type']}")
+        return decisive
+    
+    prompt = EVENT_USER_TEMPLATE.format_map({
+        'title': title,
+        'summary': summary[:300] if summary else 'N/A'
+    })
+    
     try:
-        response = client.chat.completions.create(
-            model=GROQ_CONFIG['model'],
+        response = chat_completion(
+            client,
+            model=GROQ_CONFIG['classify_model'],
             messages=[
-                {"role": "system", "content": "You are a news editor who identifies breaking news that will drive search traffic."},
+                {"role": "system", "content": EVENT_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.1,  # Low temperature for consistent classification
@@ -163,6 +238,99 @@ Reply with ONLY the category name (one word)."""
         return fast_result  # Fall back to keyword-based classification
 
 
+def classify_events_groq_batch(client: Groq, articles: List[Dict]) -> List[Dict]:
+    """
+    Event-classify several articles with a single Groq request.
+    Returns one classification per article, in order; articles missing from
+    the reply (or with an unknown category) keep their keyword classification.
+    """
+    fast_results = [classify_event_fast(a.get('title', ''), a.get('summary', '')) for a in articles]
+    
+    listing = "\n\n".join(
+        EVENT_BATCH_ENTRY_TEMPLATE.format(
+            index=i,
+            title=article.get('title', ''),
+            summary=article['summary'][:300] if article.get('summary') else 'N/A'
+        )
+        for i, article in enumerate(articles, 1)
+    )
+    
+    try:
+        response = chat_completion(
+            client,
+            model=GROQ_CONFIG['classify_model'],
+            messages=[
+                {"role": "system", "content": EVENT_BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": listing}
+            ],
+            temperature=0.1,  # Low temperature for consistent classification
+            max_tokens=20 * len(articles) + 50,
+            response_format={"type": "json_object"}
+        )
+        results = parse_json_reply(response.choices[0].message.content.strip()).get('results', [])
+    except Exception as e:
+        logger.error(f"Groq batch classification error: {e}")
+        return fast_results  # Fall back to keyword-based classification
+    
+    categories = {
+        r.get('index'): str(r.get('category', '')).strip().upper()
+        for r in results if isinstance(r, dict)
+    }
+    
+    classifications = []
+    for i, fast_result in enumerate(fast_results, 1):
+        event_type = categories.get(i)
+        if event_type in EVENT_PRIORITY:
+            classifications.append({
+                "event_type": event_type,
+                "priority": EVENT_PRIORITY[event_type],
+                "confidence": "groq",
+                "high_profile": fast_result["high_profile"]
+            })
+        else:
+            classifications.append(fast_result)
+    
+    return classifications
+
+
+def _apply_event_classification(article: Dict, classification: Dict) -> Dict:
+    """Attach an event classification to the article, boosting high-profile breaking news."""
+    title = article.get('title', '')
+    
+    # Boost priority for high-profile entities with breaking keywords
+    if classification["high_profile"] and classification["event_type"] in ["BREAKING", "ACQUISITION", "LAYOFFS"]:
+        classification["boost"] = True
+        logger.info(f"BOOSTED: {title[:50]}... → {classification['event_type']}")
+    
+    article['event_classification'] = classification
+    
+    logger.info(f"Classified: {title[:40]}... → {classification['event_type']} (P{classification['priority']})")
+    
+    return article
+
+
+def _event_cache_key(article: Dict) -> str:
+    """Content hash of an article's title and summary."""
+    text = f"{article.get('title', '')}|{article.get('summary', '')}"
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _get_cached_event(article: Dict) -> Optional[Dict]:
+    """Groq classification of the same title + summary from a recent run, if any."""
+    cached = get_cached(
+        "event_classification",
+        _event_cache_key(article),
+        ARTICLE_CONFIG['cache_max_age_hours'] * 3600
+    )
+    return orjson.loads(cached) if cached else None
+
+
+def _remember_event(article: Dict, classification: Dict) -> None:
+    """Cache a Groq classification (keyword fallbacks are cheap to redo)."""
+    if classification.get("confidence") == "groq":
+        set_cached("event_classification", _event_cache_key(article), orjson.dumps(classification).decode())
+
+
 def classify_article(article: Dict, use_groq: bool = True) -> Dict:
     """
     Main classification function. Adds event classification to article dict.
@@ -177,25 +345,70 @@ def classify_article(article: Dict, use_groq: bool = True) -> Dict:
     title = article.get('title', '')
     summary = article.get('summary', '')
     
-    if use_groq:
-        client = get_groq_client()
-        if client:
+    client = get_groq_client() if use_groq else None
+    if client:
+        classification = _get_cached_event(article)
+        if classification is None:
             classification = classify_event_groq(client, title, summary)
-        else:
-            classification = classify_event_fast(title, summary)
+            _remember_event(article, classification)
     else:
         classification = classify_event_fast(title, summary)
     
-    # Boost priority for high-profile entities with breaking keywords
-    if classification["high_profile"] and classification["event_type"] in ["BREAKING", "ACQUISITION", "LAYOFFS"]:
-        classification["boost"] = True
-        logger.info(f"BOOSTED: {title[:50]}... → {classification['event_type']}")
+    return _apply_event_classification(article, classification)
+
+
+def classify_articles_by_event(articles: List[Dict], use_groq: bool = True) -> List[Dict]:
+    """
+    Event-classify several articles. With Groq, articles are sent
+    ARTICLE_CONFIG['event_batch_size'] per request and the requests run
+    concurrently (GROQ_CONFIG['max_concurrency']). Articles whose title and
+    summary were classified in a recent run reuse that result, and decisive
+    keyword matches are not sent at all.
+    """
+    client = get_groq_client() if use_groq else None
+    if not client or not articles:
+        return [classify_article(article, use_groq=False) for article in articles]
     
-    article['event_classification'] = classification
+    # Recently classified articles and clear-cut keyword matches skip Groq
+    known = [
+        _get_cached_event(article)
+        or decisive_keyword_result(classify_event_fast(article.get('title', ''), article.get('summary', '')))
+        for article in articles
+    ]
+    pending = [article for article, classification in zip(articles, known) if classification is None]
     
-    logger.info(f"Classified: {title[:40]}... → {classification['event_type']} (P{classification['priority']})")
+    classifications = []
+    if pending:
+        batch = ARTICLE_CONFIG['event_batch_size']
+        groups = [pending[i:i + batch] for i in range(0, len(pending), batch)]
+        
+        with ThreadPoolExecutor(max_workers=min(GROQ_CONFIG['max_concurrency'], len(groups))) as executor:
+            if batch > 1:
+                group_results = executor.map(lambda g: classify_events_groq_batch(client, g), groups)
+                classifications = [c for results in group_results for c in results]
+            else:
+                classifications = list(executor.map(
+                    lambda a: classify_event_groq(client, a.get('title', ''), a.get('summary', '')),
+                    pending
+                ))
+        
+        for article, classification in zip(pending, classifications):
+            _remember_event(article, classification)
     
-    return article
+    fresh = iter(classifications)
+    for article, classification in zip(articles, known):
+        _apply_event_classification(article, classification if classification is not None else next(fresh))
+    
+    return articles
+
+
+def priority_sort_key(article: Dict) -> float:
+    """Publishing order key: event priority, with high-profile entities first within a priority."""
+    ec = article.get('event_classification', {})
+    priority = ec.get('priority', 3)
+    # High-profile gets slight boost (lower = first)
+    high_profile_boost = 0 if ec.get('high_profile') else 0.5
+    return priority + high_profile_boost
 
 
 def sort_by_priority(articles: List[Dict]) -> List[Dict]:
@@ -203,14 +416,7 @@ def sort_by_priority(articles: List[Dict]) -> List[Dict]:
     Sort articles by event priority (1 = highest = publish first).
     Within same priority, high-profile entities come first.
     """
-    def sort_key(article: Dict):
-        ec = article.get('event_classification', {})
-        priority = ec.get('priority', 3)
-        # High-profile gets slight boost (lower = first)
-        high_profile_boost = 0 if ec.get('high_profile') else 0.5
-        return priority + high_profile_boost
-    
-    return sorted(articles, key=sort_key)
+    return sorted(articles, key=priority_sort_key)
 
 
 def get_publishing_queues(articles: List[Dict]) -> Dict[str, List[Dict]]:
@@ -230,20 +436,22 @@ def get_publishing_queues(articles: List[Dict]) -> Dict[str, List[Dict]]:
         "routine": []
     }
     
+    # Bucket with each article's sort key computed once, in the same pass
     for article in articles:
-        ec = article.get('event_classification', {})
-        priority = ec.get('priority', 3)
+        priority = article.get('event_classification', {}).get('priority', 3)
         
         if priority == 1:
-            queues["breaking"].append(article)
+            queue_name = "breaking"
         elif priority == 2:
-            queues["high"].append(article)
+            queue_name = "high"
         else:
-            queues["routine"].append(article)
+            queue_name = "routine"
+        queues[queue_name].append((priority_sort_key(article), article))
     
     # Sort each queue (high-profile first within priority)
-    for queue_name in queues:
-        queues[queue_name] = sort_by_priority(queues[queue_name])
+    for queue_name, keyed in queues.items():
+        keyed.sort(key=itemgetter(0))
+        queues[queue_name] = [article for _, article in keyed]
     
     return queues
 
@@ -10,10 +10,17 @@ Strategy: Signal → Find Real Source → Generate
 """
 
 import logging
-import requests
-from typing import Dict, List, Set, Optional
+import orjson
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from datetime import datetime, timezone
 import re
+from urllib.parse import urlencode
+
+from .http_session import get_http_session
+from .cache import get_cached, set_cached
 
 logger = logging.getLogger(__name__)
 
@@ -29,50 +36,146 @@ REDDIT_SUBREDDITS = [
 REDDIT_MIN_SCORE = 100
 HN_MIN_SCORE = 50
 
+# Terms that mark a GitHub repo as an AI/ML/tech tool
+GITHUB_TECH_KEYWORDS = ["ai", "llm", "gpt", "ml", "machine learning", "neural", "agent", "automation"]
 
-def fetch_reddit_trending() -> List[Dict]:
+# Keyword extraction for signal matching
+KEYWORD_WORD_RE = re.compile(r'\b[a-z]{3,}\b')
+
+# Common stop words
+STOP_WORDS = frozenset({
+    "the", "and", "for", "are", "but", "not", "you", "all", "can", "had",
+    "her", "was", "one", "our", "out", "day", "get", "has", "him", "his",
+    "how", "its", "may", "new", "now", "old", "see", "way", "who", "did",
+    "been", "have", "from", "this", "that", "with", "they", "will", "what",
+    "when", "your", "said", "each", "just", "like", "over", "such", "into",
+    "year", "some", "could", "them", "than", "then", "being", "about", "after"
+})
+
+# High-value tech keywords to always keep
+TECH_TERMS = frozenset({
+    "openai", "google", "apple", "microsoft", "meta", "amazon", "nvidia",
+    "tesla", "anthropic", "chatgpt", "gpt", "gemini", "claude", "waymo",
+    "robotaxi", "autonomous", "robot", "drone", "model", "launch", "release",
+    "acquisition", "funding", "startup", "developer", "programming", "code"
+})
+
+
+def get_json_conditional(url: str, params: Dict = None, headers: Dict = None, timeout: int = 10):
     """
-    Fetch hot posts from tech-related subreddits.
+    GET a JSON API, revalidating the previous run's response with its ETag /
+    Last-Modified. A 304 reuses the stored body without downloading it again.
+    """
+    cache_key = f"{url}?{urlencode(params)}" if params else url
+    cached = get_cached("http_conditional", cache_key)
+    entry = orjson.loads(cached) if cached else None
+    
+    request_headers = dict(headers or {})
+    if entry:
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+    
+    response = get_http_session().get(url, params=params, headers=request_headers, timeout=timeout)
+    if response.status_code == 304 and entry:
+        logger.debug(f"Not modified since last run: {cache_key}")
+        return entry["body"]
+    response.raise_for_status()
+    
+    data = orjson.loads(response.content)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        set_cached("http_conditional", cache_key, orjson.dumps({
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": data
+        }).decode())
+    
+    return data
+
+
+def fetch_subreddit_trending(subreddit: str) -> List[Dict]:
+    """
+    Fetch hot posts from one subreddit.
     Returns list of trending topics with keywords.
     """
     trending = []
     
-    for subreddit in REDDIT_SUBREDDITS:
-        try:
-            url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=15"
-            headers = {"User-Agent": "NewsRadar/1.0"}
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get("data", {}).get("children", [])
-            
-            for post in posts:
-                post_data = post.get("data", {})
-                score = post_data.get("score", 0)
-                
-                # Only high-engagement posts
-                if score >= REDDIT_MIN_SCORE:
-                    title = post_data.get("title", "")
-                    trending.append({
-                        "source": "reddit",
-                        "subreddit": subreddit,
-                        "title": title,
-                        "score": score,
-                        "url": f"https://reddit.com{post_data.get('permalink', '')}",
-                        "keywords": extract_keywords(title),
-                        "fetched_at": datetime.now(timezone.utc).isoformat()
-                    })
-            
-            logger.info(f"Reddit r/{subreddit}: {len([p for p in trending if p['subreddit'] == subreddit])} trending posts")
+    try:
+        url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=15"
+        
+        # Reddit requires a User-Agent, which the shared session sets
+        data = get_json_conditional(url, timeout=10)
+        posts = data.get("data", {}).get("children", [])
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        
+        for post in posts:
+            post_data = post.get("data", {})
+            score = post_data.get("score", 0)
             
-        except Exception as e:
-            logger.error(f"Error fetching Reddit r/{subreddit}: {e}")
+            # Only high-engagement posts
+            if score >= REDDIT_MIN_SCORE:
+                title = post_data.get("title", "")
+                trending.append({
+                    "source": "reddit",
+                    "subreddit": subreddit,
+                    "title": title,
+                    "score": score,
+                    "url": f"https://reddit.com{post_data.get('permalink', '')}",
+                    "keywords": extract_keywords(title),
+                    "fetched_at": fetched_at
+                })
+        
+        logger.info(f"Reddit r/{subreddit}: {len(trending)} trending posts")
+    
+    except Exception as e:
+        logger.error(f"Error fetching Reddit r/{subreddit}: {e}")
     
     return trending
 
 
+def fetch_reddit_trending() -> List[Dict]:
+    """
+    Fetch hot posts from tech-related subreddits (concurrently).
+    Returns list of trending topics with keywords.
+    """
+    with ThreadPoolExecutor(max_workers=len(REDDIT_SUBREDDITS)) as executor:
+        per_subreddit = executor.map(fetch_subreddit_trending, REDDIT_SUBREDDITS)
+        return [post for posts in per_subreddit for post in posts]
+
+
+def fetch_hackernews_story(story_id: int, fetched_at: str) -> Optional[Dict]:
+    """
+    Fetch one Hacker News item.
+    Returns it as a trending topic if it is a high-scoring story, otherwise None.
+    """
+    try:
+        item_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
+        item_response = get_http_session().get(item_url, timeout=5)
+        item = orjson.loads(item_response.content)
+        
+        if item and item.get("type") == "story":
+            score = item.get("score", 0)
+            
+            if score >= HN_MIN_SCORE:
+                title = item.get("title", "")
+                return {
+                    "source": "hackernews",
+                    "title": title,
+                    "score": score,
+                    "url": item.get("url", f"https://news.ycombinator.com/item?id={story_id}"),
+                    "keywords": extract_keywords(title),
+                    "fetched_at": fetched_at
+                }
+    
+    except Exception as e:
+        logger.debug(f"Error fetching HN item {story_id}: {e}")
+    
+    return None
+
+
 def fetch_hackernews_trending() -> List[Dict]:
     """
     Fetch top stories from Hacker News.
@@ -83,33 +186,17 @@ def fetch_hackernews_trending() -> List[Dict]:
     try:
         # Get top story IDs
         url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-        response = requests.get(url, timeout=10)
+        response = get_http_session().get(url, timeout=10)
         response.raise_for_status()
         
-        story_ids = response.json()[:20]  # Top 20
+        story_ids = orjson.loads(response.content)[:20]  # Top 20
+        fetched_at = datetime.now(timezone.utc).isoformat()
         
-        for story_id in story_ids:
-            try:
-                item_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-                item_response = requests.get(item_url, timeout=5)
-                item = item_response.json()
-                
-                if item and item.get("type") == "story":
-                    score = item.get("score", 0)
-                    
-                    if score >= HN_MIN_SCORE:
-                        title = item.get("title", "")
-                        trending.append({
-                            "source": "hackernews",
-                            "title": title,
-                            "score": score,
-                            "url": item.get("url", f"https://news.ycombinator.com/item?id={story_id}"),
-                            "keywords": extract_keywords(title),
-                            "fetched_at": datetime.now(timezone.utc).isoformat()
-                        })
-                        
-            except Exception as e:
-                logger.debug(f"Error fetching HN item {story_id}: {e}")
+        # Fetch the items in parallel rather than one round-trip at a time
+        if story_ids:
+            with ThreadPoolExecutor(max_workers=len(story_ids)) as executor:
+                stories = executor.map(lambda story_id: fetch_hackernews_story(story_id, fetched_at), story_ids)
+                trending = [story for story in stories if story]
         
         logger.info(f"Hacker News: {len(trending)} trending stories")
         
@@ -138,11 +225,9 @@ def fetch_github_trending() -> List[Dict]:
         }
         headers = {"Accept": "application/vnd.github.v3+json"}
         
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
+        data = get_json_conditional(url, params=params, headers=headers, timeout=10)
         repos = data.get("items", [])
+        fetched_at = datetime.now(timezone.utc).isoformat()
         
         for repo in repos:
             name = repo.get("name", "")
@@ -151,9 +236,8 @@ def fetch_github_trending() -> List[Dict]:
             
             # Focus on AI/ML/tech tools
             full_text = f"{name} {description}".lower()
-            tech_keywords = ["ai", "llm", "gpt", "ml", "machine learning", "neural", "agent", "automation"]
             
-            if any(kw in full_text for kw in tech_keywords):
+            if any(kw in full_text for kw in GITHUB_TECH_KEYWORDS):
                 trending.append({
                     "source": "github",
                     "title": f"{name}: {description[:100]}",
@@ -161,7 +245,7 @@ def fetch_github_trending() -> List[Dict]:
                     "url": repo.get("html_url", ""),
                     "keywords": extract_keywords(f"{name} {description}"),
                     "language": repo.get("language", ""),
-                    "fetched_at": datetime.now(timezone.utc).isoformat()
+                    "fetched_at": fetched_at
                 })
         
         logger.info(f"GitHub: {len(trending)} trending AI/ML repos")
@@ -172,38 +256,20 @@ def fetch_github_trending() -> List[Dict]:
     return trending
 
 
-def extract_keywords(text: str) -> Set[str]:
+def extract_keywords(text: str) -> FrozenSet[str]:
     """
     Extract meaningful keywords from text for matching.
+    Words are interned, so a keyword repeated across many signals is
+    stored once.
     """
     # Convert to lowercase and extract words
-    text = text.lower()
-    words = re.findall(r'\b[a-z]{3,}\b', text)
-    
-    # Remove common stop words
-    stop_words = {
-        "the", "and", "for", "are", "but", "not", "you", "all", "can", "had",
-        "her", "was", "one", "our", "out", "day", "get", "has", "him", "his",
-        "how", "its", "may", "new", "now", "old", "see", "way", "who", "did",
-        "been", "have", "from", "this", "that", "with", "they", "will", "what",
-        "when", "your", "said", "each", "just", "like", "over", "such", "into",
-        "year", "some", "could", "them", "than", "then", "being", "about", "after"
-    }
-    
-    # High-value tech keywords to always keep
-    tech_terms = {
-        "openai", "google", "apple", "microsoft", "meta", "amazon", "nvidia",
-        "tesla", "anthropic", "chatgpt", "gpt", "gemini", "claude", "waymo",
-        "robotaxi", "autonomous", "robot", "drone", "model", "launch", "release",
-        "acquisition", "funding", "startup", "developer", "programming", "code"
-    }
-    
-    keywords = set()
-    for word in words:
-        if word in tech_terms or (word not in stop_words and len(word) > 3):
-            keywords.add(word)
-    
-    return keywords
+    words = KEYWORD_WORD_RE.findall(text.lower())
+    
+    # Keep tech terms, and other words of 4+ letters that aren't stop words
+    return frozenset(
+        sys.intern(word) for word in words
+        if word in TECH_TERMS or (len(word) > 3 and word not in STOP_WORDS)
+    )
 
 
 def get_all_trending_signals() -> Dict:
@@ -213,20 +279,25 @@ def get_all_trending_signals() -> Dict:
     """
     logger.info("Fetching trending signals from fast sources...")
     
-    signals = {
-        "reddit": fetch_reddit_trending(),
-        "hackernews": fetch_hackernews_trending(),
-        "github": fetch_github_trending(),
-        "fetched_at": datetime.now(timezone.utc).isoformat()
-    }
+    # The sources are independent, so fetch them at the same time
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        reddit = executor.submit(fetch_reddit_trending)
+        hackernews = executor.submit(fetch_hackernews_trending)
+        github = executor.submit(fetch_github_trending)
+        
+        signals = {
+            "reddit": reddit.result(),
+            "hackernews": hackernews.result(),
+            "github": github.result(),
+            "fetched_at": datetime.now(timezone.utc).isoformat()
+        }
     
     # Combine all keywords for matching
-    all_keywords = set()
-    for source in ["reddit", "hackernews", "github"]:
-        for item in signals[source]:
-            all_keywords.update(item.get("keywords", set()))
-    
-    signals["all_keywords"] = all_keywords
+    signals["all_keywords"] = frozenset().union(*(
+        item.get("keywords", frozenset())
+        for source in ["reddit", "hackernews", "github"]
+        for item in signals[source]
+    ))
     
     total = len(signals["reddit"]) + len(signals["hackernews"]) + len(signals["github"])
     logger.info(f"Total trending signals: {total}")
@@ -234,7 +305,30 @@ def get_all_trending_signals() -> Dict:
     return signals
 
 
-def match_article_to_signals(article: Dict, signals: Dict, min_matches: int = 2) -> Dict:
+def build_signal_index(signals: Dict) -> Dict[str, List[Tuple[int, str, Dict]]]:
+    """
+    Inverted index over the trending signals: keyword -> (position, source,
+    signal) for every signal containing it. Positions follow the order the
+    signals are checked in (reddit, hackernews, github).
+    """
+    index = defaultdict(list)
+    position = 0
+    
+    for source in ["reddit", "hackernews", "github"]:
+        for signal in signals.get(source, []):
+            for keyword in signal.get("keywords", set()):
+                index[keyword].append((position, source, signal))
+            position += 1
+    
+    return index
+
+
+def match_article_to_signals(
+    article: Dict,
+    signals: Dict,
+    min_matches: int = 2,
+    index: Optional[Dict[str, List[Tuple[int, str, Dict]]]] = None
+) -> Dict:
     """
     Check if an RSS article matches any trending signals.
     Returns match info if found, None otherwise.
@@ -243,40 +337,49 @@ def match_article_to_signals(article: Dict, signals: Dict, min_matches: int = 2)
         article: RSS article with 'title' and 'summary'
         signals: Output from get_all_trending_signals()
         min_matches: Minimum keyword matches required
+        index: build_signal_index(signals), when matching many articles
     
     Returns:
         Match info dict or None
     """
+    if index is None:
+        index = build_signal_index(signals)
+    
     article_text = f"{article.get('title', '')} {article.get('summary', '')}".lower()
     article_keywords = extract_keywords(article_text)
     
+    # Count keyword matches, touching only signals that share a keyword
+    match_counts = Counter()
+    candidates = {}
+    for keyword in article_keywords:
+        for position, source, signal in index.get(keyword, ()):
+            match_counts[position] += 1
+            candidates[position] = (source, signal)
+    
     best_match = None
     best_score = 0
     
-    # Check against each source
-    for source in ["reddit", "hackernews", "github"]:
-        for signal in signals.get(source, []):
-            signal_keywords = signal.get("keywords", set())
+    # In signal order, so ties still go to the first signal checked
+    for position in sorted(match_counts):
+        match_count = match_counts[position]
+        
+        if match_count >= min_matches:
+            source, signal = candidates[position]
             
-            # Count keyword matches
-            matches = article_keywords.intersection(signal_keywords)
-            match_count = len(matches)
+            # Score based on matches and signal engagement
+            score = match_count * signal.get("score", 1)
             
-            if match_count >= min_matches:
-                # Score based on matches and signal engagement
-                score = match_count * signal.get("score", 1)
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = {
-                        "matched": True,
-                        "signal_source": source,
-                        "signal_title": signal.get("title", "")[:100],
-                        "signal_score": signal.get("score", 0),
-                        "matched_keywords": list(matches),
-                        "match_strength": match_count,
-                        "combined_score": score
-                    }
+            if score > best_score:
+                best_score = score
+                best_match = {
+                    "matched": True,
+                    "signal_source": source,
+                    "signal_title": signal.get("title", "")[:100],
+                    "signal_score": signal.get("score", 0),
+                    "matched_keywords": list(article_keywords.intersection(signal.get("keywords", set()))),
+                    "match_strength": match_count,
+                    "combined_score": score
+                }
     
     return best_match
 
@@ -296,9 +399,10 @@ def boost_viral_articles(articles: List[Dict], signals: Dict = None) -> List[Dic
         signals = get_all_trending_signals()
     
     boosted_count = 0
+    index = build_signal_index(signals)
     
     for article in articles:
-        match = match_article_to_signals(article, signals)
+        match = match_article_to_signals(article, signals, index=index)
         
         if match:
             # Mark as viral
@@ -0,0 +1,159 @@
+"""
+Auto News Pipeline - Groq Client
+Shared Groq client plus the rate-limited, retrying call helper used by
+every module that talks to Groq.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import orjson
+
+# groq pulls in httpx and pydantic, so it is only imported once needed
+if TYPE_CHECKING:
+    from groq import Groq
+
+from .config import GROQ_API_KEY, GROQ_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Retry settings for transient Groq failures (429s, timeouts, 5xx)
+MAX_RETRIES = 3  # Retries after the first attempt
+RETRY_BACKOFF = 0.5  # Initial backoff seconds, doubles each retry
+RETRY_BACKOFF_MAX = 8.0  # Cap on a single backoff (also caps Retry-After)
+RETRY_JITTER = 1.0  # Up to this many random seconds added to each backoff
+
+# Matches a ```/```json fenced reply; the closing fence may be missing when
+# the response was cut off
+_FENCE_RE = re.compile(r'^```[^\n]*\n(.*?)(?:\n?```)?\s*$', re.S)
+
+# Caps concurrent Groq requests from all threads in the process
+_request_slots = threading.BoundedSemaphore(GROQ_CONFIG['max_in_flight_requests'])
+
+
+@lru_cache(maxsize=1)
+def get_groq_client() -> Optional[Groq]:
+    """
+    Initialize Groq client.
+    The client is shared by every module and thread so its HTTP connection
+    pool keeps connections to Groq alive between calls.
+    """
+    if not GROQ_API_KEY:
+        logger.warning("GROQ_API_KEY not set.")
+        return None
+    
+    import httpx
+    from groq import Groq
+    
+    # HTTP/2 multiplexes concurrent calls over one connection; keep-alive
+    # slots match the number of requests allowed in flight
+    http_client = httpx.Client(
+        http2=True,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=64,
+            max_keepalive_connections=GROQ_CONFIG['max_in_flight_requests']
+        )
+    )
+    return Groq(api_key=GROQ_API_KEY, http_client=http_client)
+
+
+@lru_cache(maxsize=1)
+def _retryable_errors() -> Tuple[type, ...]:
+    """Groq exceptions worth retrying (imported lazily)."""
+    from groq import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+    return (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limited_api_call(func):
+    """
+    Decorator for API calls with jittered exponential backoff retry.
+    Retries rate limits (honouring Retry-After), timeouts, connection
+    errors and 5xx responses; anything else is re-raised immediately.
+    """
+    def wrapper(*args, **kwargs):
+        retries = 0
+        
+        while True:
+            try:
+                return func(*args, **kwargs)
+                
+            except _retryable_errors() as e:
+                if retries >= MAX_RETRIES:
+                    logger.error(f"API retries exhausted: {e}")
+                    raise
+                
+                retries += 1
+                backoff_time = _retry_after(e)
+                if backoff_time is None:
+                    backoff_time = RETRY_BACKOFF * (2 ** (retries - 1))
+                backoff_time = min(backoff_time, RETRY_BACKOFF_MAX) + random.uniform(0, RETRY_JITTER)
+                
+                logger.warning(f"{type(e).__name__}, retry {retries}/{MAX_RETRIES} in {backoff_time:.1f}s...")
+                time.sleep(backoff_time)
+    
+    return wrapper
+
+
+def _release_after_stream(stream):
+    """Yield a streamed response's chunks, freeing its request slot once it is consumed or closed."""
+    try:
+        yield from stream
+    finally:
+        _request_slots.release()
+
+
+@rate_limited_api_call
+def chat_completion(client: Groq, **kwargs):
+    """
+    Groq chat completion with retries for transient failures.
+    Waits for a free request slot first; backoff sleeps happen outside it.
+    A streamed response (stream=True) keeps its slot until the returned
+    iterator is exhausted or closed.
+    """
+    if not kwargs.get('stream'):
+        with _request_slots:
+            return client.chat.completions.create(**kwargs)
+    
+    _request_slots.acquire()
+    try:
+        stream = client.chat.completions.create(**kwargs)
+    except BaseException:
+        _request_slots.release()
+        raise
+    return _release_after_stream(stream)
+
+
+def _strip_fence(text: str) -> str:
+    """Remove a markdown code fence wrapped around a model reply."""
+    match = _FENCE_RE.match(text)
+    return match.group(1) if match else text
+
+
+def parse_json_reply(text: str):
+    """
+    Parse a JSON-mode reply. Falls back to stripping a markdown fence in
+    case the model wrapped its output anyway.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return orjson.loads(_strip_fence(text))
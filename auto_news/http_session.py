@@ -0,0 +1,33 @@
+"""
+Auto News Pipeline - Shared HTTP Session
+One pooled requests.Session for the non-Groq APIs (Reddit, Hacker News,
+GitHub, Leonardo) so connections are kept alive between calls.
+"""
+
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "NewsRadar/1.0"
+
+
+@lru_cache(maxsize=1)
+def get_http_session() -> requests.Session:
+    """
+    Build the shared session on first use.
+    Idempotent requests that hit a connection error or a 429/5xx are retried
+    twice with a short backoff.
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
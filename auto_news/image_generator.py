@@ -3,26 +3,44 @@ Auto News Pipeline - Leonardo AI Image Generator
 Generates featured images for articles using Leonardo AI.
 """
 
+import hashlib
 import logging
+import orjson
+import os
+import shutil
+import threading
 import time
 import requests
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from pathlib import Path
 
 from .config import LEONARDO_API_KEY, LEONARDO_CONFIG, IMAGES_DIR, ASSETS_DIR
+from .http_session import get_http_session
+from .cache import get_cached, set_cached
 
 logger = logging.getLogger(__name__)
 
 LEONARDO_API_BASE = "https://cloud.leonardo.ai/api/rest/v1"
 
+# API headers, built once and sent with every create/poll request
+LEONARDO_HEADERS = {
+    "Authorization": f"Bearer {LEONARDO_API_KEY}",
+    "Content-Type": "application/json",
+    "Accept": "application/json"
+}
 
-def get_headers() -> Dict:
-    """Get API headers."""
-    return {
-        "Authorization": f"Bearer {LEONARDO_API_KEY}",
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
+
+# Legacy fallback prompts - PHOTOREALISTIC style, no neon/circuits
+_LEGACY_IMAGE_PROMPTS = {
+    "AI": "Close-up of a developer's hands typing on a laptop in a quiet co-working space, code editor on screen, soft window light, shallow depth of field, realistic candid photography.",
+    "Robotics": "Medium shot of a self-driving car at a city intersection, dashboard sensors visible, calm passenger in back seat, natural dusk lighting, photorealistic — no neon.",
+    "Tech Policy": "Wide shot of a modern corporate headquarters building exterior under overcast skies, employees entering lobby, documentary photography style.",
+    "Gaming": "Medium shot of a focused gamer with headphones in a dimly lit room, multiple monitors showing gameplay, subtle RGB lighting, candid moment, realistic photography.",
+    "Mobile": "Close-up of hands holding a smartphone in a coffee shop, natural daylight from window, screen showing app, shallow depth of field, authentic lifestyle photography.",
+    "Cybersecurity": "Medium shot of a security analyst at workstation with monitors showing dashboards, focused expression, office ambient lighting, realistic workplace photography."
+}
+_LEGACY_DEFAULT_PROMPT = "Medium shot of a modern open-plan tech office, employees at standing desks, large windows with natural light, authentic workplace photography — no staged poses."
 
 
 def get_legacy_image_prompt(article: Dict) -> str:
@@ -34,21 +52,7 @@ def get_legacy_image_prompt(article: Dict) -> str:
     better prompts via generate_image_prompt() function.
     """
     topic = article.get('classification', {}).get('primary_topic', 'Technology')
-    title = article.get('title', '')
-    
-    # Updated fallback prompts - PHOTOREALISTIC style, no neon/circuits
-    base_prompts = {
-        "AI": "Close-up of a developer's hands typing on a laptop in a quiet co-working space, code editor on screen, soft window light, shallow depth of field, realistic candid photography.",
-        "Robotics": "Medium shot of a self-driving car at a city intersection, dashboard sensors visible, calm passenger in back seat, natural dusk lighting, photorealistic — no neon.",
-        "Tech Policy": "Wide shot of a modern corporate headquarters building exterior under overcast skies, employees entering lobby, documentary photography style.",
-        "Gaming": "Medium shot of a focused gamer with headphones in a dimly lit room, multiple monitors showing gameplay, subtle RGB lighting, candid moment, realistic photography.",
-        "Mobile": "Close-up of hands holding a smartphone in a coffee shop, natural daylight from window, screen showing app, shallow depth of field, authentic lifestyle photography.",
-        "Cybersecurity": "Medium shot of a security analyst at workstation with monitors showing dashboards, focused expression, office ambient lighting, realistic workplace photography."
-    }
-    
-    base = base_prompts.get(topic, "Medium shot of a modern open-plan tech office, employees at standing desks, large windows with natural light, authentic workplace photography — no staged poses.")
-    
-    return base
+    return _LEGACY_IMAGE_PROMPTS.get(topic, _LEGACY_DEFAULT_PROMPT)
 
 
 def create_generation(prompt: str) -> Optional[str]:
@@ -75,10 +79,10 @@ def create_generation(prompt: str) -> Optional[str]:
     
     try:
         logger.info(f"Sending request to Leonardo AI with model: {LEONARDO_CONFIG['model_id']}")
-        response = requests.post(url, headers=get_headers(), json=payload)
+        response = get_http_session().post(url, headers=LEONARDO_HEADERS, data=orjson.dumps(payload))
         response.raise_for_status()
         
-        data = response.json()
+        data = orjson.loads(response.content)
         generation_id = data.get('sdGenerationJob', {}).get('generationId')
         
         logger.info(f"Started image generation: {generation_id}")
@@ -93,20 +97,34 @@ def create_generation(prompt: str) -> Optional[str]:
         return None
 
 
-def wait_for_generation(generation_id: str, max_wait: int = 120) -> Optional[str]:
+def wait_for_generation(
+    generation_id: str,
+    max_wait: int = 120,
+    initial_delay: float = None,
+    max_delay: float = None
+) -> Optional[str]:
     """
     Wait for generation to complete and return the image URL.
+    The wait between polls starts at initial_delay seconds and grows 1.5x per
+    poll up to max_delay, so quick generations are picked up within a second or two.
+    Both default to LEONARDO_CONFIG['poll_initial_delay'] / ['poll_max_delay'].
     """
+    if initial_delay is None:
+        initial_delay = LEONARDO_CONFIG['poll_initial_delay']
+    if max_delay is None:
+        max_delay = LEONARDO_CONFIG['poll_max_delay']
+    
     url = f"{LEONARDO_API_BASE}/generations/{generation_id}"
     
-    start_time = time.time()
+    deadline = time.monotonic() + max_wait
+    delay = initial_delay
     
-    while time.time() - start_time < max_wait:
+    while time.monotonic() < deadline:
         try:
-            response = requests.get(url, headers=get_headers())
+            response = get_http_session().get(url, headers=LEONARDO_HEADERS)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             generation = data.get('generations_by_pk', {})
             status = generation.get('status')
             
@@ -122,32 +140,86 @@ def wait_for_generation(generation_id: str, max_wait: int = 120) -> Optional[str
                 logger.error("Image generation failed")
                 return None
             
-            # Still processing, wait and retry
-            time.sleep(5)
+            # Still processing, wait and retry (never sleeping past the deadline)
+            time.sleep(max(0, min(delay, deadline - time.monotonic())))
+            delay = min(delay * 1.5, max_delay)
             
         except Exception as e:
             logger.error(f"Error checking generation status: {e}")
-            time.sleep(5)
+            time.sleep(max(0, min(max_delay, deadline - time.monotonic())))
     
     logger.error("Image generation timed out")
     return None
 
 
+def _link_or_copy(source: Path, target: Path) -> None:
+    """Hard-link source to target, replacing it (copy if the filesystem can't hard-link)."""
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _image_cache_key(article: Dict, prompt: str, prompt_source: str) -> str:
+    """
+    Key for reusing a generated image. Groq-written prompts describe one story,
+    so an identical prompt (e.g. a cross-posted article) reuses its image; the
+    static fallback prompts are shared by many articles, so those are also
+    keyed by article.
+    """
+    parts = [prompt, LEONARDO_CONFIG['model_id'], str(LEONARDO_CONFIG['width']), str(LEONARDO_CONFIG['height'])]
+    if prompt_source != 'groq':
+        parts.append(article.get('id', ''))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+
+def _reuse_cached_image(cached: Dict, filename: str) -> Optional[Dict]:
+    """Put a previously generated image under this article's filename, if its file still exists."""
+    source = Path(cached['local_path'])
+    if not source.exists():
+        return None
+    
+    if cached['filename'] != filename:
+        # Copy rather than link, so each article owns its image file
+        filepath = IMAGES_DIR / filename
+        shutil.copyfile(source, filepath)
+        _link_or_copy(filepath, ASSETS_DIR / filename)
+    else:
+        filepath = source
+        if not (ASSETS_DIR / filename).exists():
+            _link_or_copy(source, ASSETS_DIR / filename)
+    
+    logger.info(f"Reusing generated image {cached['filename']} as {filename}")
+    return {
+        **cached,
+        "local_path": str(filepath),
+        "filename": filename,
+        "assets_path": f"assets/{filename}"
+    }
+
+
 def download_image(url: str, filename: str) -> Optional[Path]:
     """
     Download image from URL and save to disk.
     """
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        # Save to generated images directory
+        # Stream to a temp file, then swap it in: the target may be hard-linked
+        # into assets, and writing it in place would rewrite the published copy
         filepath = IMAGES_DIR / filename
-        filepath.write_bytes(response.content)
+        tmp_path = filepath.with_name(f".{filename}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with get_http_session().get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+            os.replace(tmp_path, filepath)
+        finally:
+            tmp_path.unlink(missing_ok=True)
         
-        # Also copy to assets directory for the site
-        assets_path = ASSETS_DIR / filename
-        assets_path.write_bytes(response.content)
+        # Also link into the assets directory for the site
+        _link_or_copy(filepath, ASSETS_DIR / filename)
         
         logger.info(f"Image saved: {filepath}")
         return filepath
@@ -186,6 +258,23 @@ def generate_featured_image(article: Dict) -> Optional[Dict]:
         suggested_filename = None
         logger.info(f"Using legacy image prompt: {prompt[:80]}...")
     
+    # Determine filename
+    if suggested_filename:
+        # Use suggested filename from prompt generator
+        filename = f"{suggested_filename}.png"
+    else:
+        # Fall back to slug-based filename
+        slug = article.get('metadata', {}).get('slug', article.get('id', 'article'))
+        filename = f"{slug}.png"
+    
+    # Reuse an image generated recently for the same prompt
+    cache_key = _image_cache_key(article, prompt, image_prompt_data.get('source', 'legacy'))
+    cached = get_cached("featured_image", cache_key, LEONARDO_CONFIG['image_cache_max_age_days'] * 86400)
+    if cached:
+        result = _reuse_cached_image(orjson.loads(cached), filename)
+        if result:
+            return result
+    
     # Start generation
     generation_id = create_generation(prompt)
     if not generation_id:
@@ -196,20 +285,11 @@ def generate_featured_image(article: Dict) -> Optional[Dict]:
     if not image_url:
         return create_placeholder_result(article)
     
-    # Determine filename
-    if suggested_filename:
-        # Use suggested filename from prompt generator
-        filename = f"{suggested_filename}.png"
-    else:
-        # Fall back to slug-based filename
-        slug = article.get('metadata', {}).get('slug', article.get('id', 'article'))
-        filename = f"{slug}.png"
-    
     filepath = download_image(image_url, filename)
     if not filepath:
         return create_placeholder_result(article)
     
-    return {
+    result = {
         "generated": True,
         "prompt": prompt,
         "url": image_url,
@@ -218,6 +298,8 @@ def generate_featured_image(article: Dict) -> Optional[Dict]:
         "assets_path": f"assets/{filename}",
         "prompt_source": image_prompt_data.get('source', 'legacy')
     }
+    set_cached("featured_image", cache_key, orjson.dumps(result).decode())
+    return result
 
 
 def create_placeholder_result(article: Dict) -> Dict:
@@ -244,6 +326,38 @@ def generate_image_for_article(article: Dict) -> Dict:
     return article
 
 
+def generate_images_for_articles(articles: List[Dict], concurrency: int = None) -> List[Dict]:
+    """
+    Add featured images to several articles concurrently. Each image is a
+    create -> poll -> download round spent mostly waiting on Leonardo.
+    Articles whose image generation raises get the placeholder.
+    """
+    if concurrency is None:
+        concurrency = LEONARDO_CONFIG['max_concurrency']
+    
+    if not articles:
+        return articles
+    
+    if not LEONARDO_API_KEY:
+        logger.warning("Leonardo API key not set. Using placeholders.")
+        for article in articles:
+            article['featured_image'] = create_placeholder_result(article)
+        return articles
+    
+    def generate(article: Dict) -> Dict:
+        try:
+            return generate_image_for_article(article)
+        except Exception as e:
+            logger.error(f"Error generating image for {article.get('id', '?')}: {e}")
+            article['featured_image'] = create_placeholder_result(article)
+            return article
+    
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(articles))) as executor:
+        list(executor.map(generate, articles))
+    
+    return articles
+
+
 if __name__ == "__main__":
     # Test the image generator
     logging.basicConfig(level=logging.INFO)
@@ -5,30 +5,24 @@ Runs the complete pipeline: Fetch → Classify Events → Prioritize → Generat
 NEW: Priority queue system that ensures breaking news beats routine updates.
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import List, Dict
 
-from .config import LOG_FILE, LOG_LEVEL, ARTICLE_CONFIG
+from .config import LOG_FILE, LOG_LEVEL, ARTICLE_CONFIG, LEONARDO_API_KEY
 from .rss_fetcher import fetch_and_process_feeds
 from .classifier import classify_articles, filter_relevant_articles
-from .event_classifier import classify_article, get_publishing_queues
+from .event_classifier import classify_articles_by_event, get_publishing_queues
 from .fast_sources import get_all_trending_signals, boost_viral_articles
-from .article_generator import generate_full_article
-from .image_generator import generate_image_for_article
-from .publisher import publish_articles, article_exists
-
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from .article_generator import generate_articles_batch, find_covering_article
+from .image_generator import generate_images_for_articles
+from .publisher import publish_articles, get_published_ids
 
 logger = logging.getLogger(__name__)
 
@@ -82,6 +76,11 @@ def run_pipeline(
         "published_articles": []
     }
     
+    # Trending signals don't depend on the feeds, so fetch them in the
+    # background while the articles are fetched and classified
+    background = ThreadPoolExecutor(max_workers=1)
+    signals_future = background.submit(get_all_trending_signals)
+    
     try:
         # Step 1: Fetch RSS feeds
         logger.info("\n📡 Step 1: Fetching RSS feeds...")
@@ -109,7 +108,8 @@ def run_pipeline(
             return results
         
         # Filter out already published articles EARLY
-        new_articles = [a for a in relevant if not article_exists(a['id'])]
+        published_ids = get_published_ids()
+        new_articles = [a for a in relevant if a['id'] not in published_ids]
         skipped = len(relevant) - len(new_articles)
         if skipped > 0:
             logger.info(f"Skipping {skipped} already published articles")
@@ -120,13 +120,12 @@ def run_pipeline(
         
         # Step 4: EVENT CLASSIFICATION (NEW!)
         logger.info("\n⚡ Step 4: Classifying by EVENT TYPE...")
-        for article in new_articles:
-            classify_article(article, use_groq=True)
+        classify_articles_by_event(new_articles, use_groq=True)
         
         # Step 4.5: VIRAL BOOST - Check against trending signals
         logger.info("\n🔥 Step 4.5: Checking trending signals (Reddit/HN/GitHub)...")
         try:
-            signals = get_all_trending_signals()
+            signals = signals_future.result()
             new_articles = boost_viral_articles(new_articles, signals)
             results["trending_signals"] = {
                 "reddit": len(signals.get("reddit", [])),
@@ -176,6 +175,17 @@ def run_pipeline(
                 to_process.append(article)
                 logger.info(f"  ⚪ ROUTINE (filler): {article['title'][:50]}...")
         
+        # Skip stories already covered by a published article generated from
+        # another source (a near-duplicate title + summary)
+        uncovered = []
+        for article in to_process:
+            covering = find_covering_article(article)
+            if covering and covering['id'] in published_ids:
+                logger.info(f"  Already covered by {covering['slug']}: {article['title'][:50]}...")
+            else:
+                uncovered.append(article)
+        to_process = uncovered
+        
         # Apply manual limit if specified
         if limit:
             to_process = to_process[:limit]
@@ -190,40 +200,42 @@ def run_pipeline(
         logger.info("\n✍️ Step 6: Generating articles...")
         generated_articles = []
         
-        for i, article in enumerate(to_process, 1):
+        # Text generation is network-bound, so run the whole batch concurrently.
+        # Featured images render alongside the text of each article (without
+        # a Leonardo key they all get the placeholder below instead)
+        render_images = not skip_images and bool(LEONARDO_API_KEY)
+        batch_results = generate_articles_batch(to_process, with_images=render_images)
+        
+        for i, (article, generated) in enumerate(zip(to_process, batch_results), 1):
             ec = article.get('event_classification', {})
             event_type = ec.get('event_type', 'UNKNOWN')
             
             logger.info(f"\n--- [{event_type}] Article {i}/{len(to_process)} ---")
             logger.info(f"Title: {article['title'][:60]}...")
             
-            try:
-                # Generate article content
-                generated = generate_full_article(article)
-                
-                if generated:
-                    # Carry over event classification
-                    generated['event_classification'] = ec
-                    
-                    # Generate featured image
-                    if not skip_images:
-                        logger.info("🖼️ Generating featured image...")
-                        generated = generate_image_for_article(generated)
-                    else:
-                        generated['featured_image'] = {
-                            "generated": False,
-                            "assets_path": "assets/GD.PNG"
-                        }
-                    
-                    generated_articles.append(generated)
-                    logger.info(f"✅ Generated: {generated['metadata']['slug']}")
-                else:
-                    logger.error(f"Failed to generate: {article['title'][:50]}")
-                    results["errors"].append(f"Generation failed: {article['id']}")
-                    
-            except Exception as e:
-                logger.error(f"Error processing article: {e}")
-                results["errors"].append(f"Error: {article['id']} - {str(e)}")
+            if generated:
+                # Carry over event classification
+                generated['event_classification'] = ec
+                generated_articles.append(generated)
+            else:
+                logger.error(f"Failed to generate: {article['title'][:50]}")
+                results["errors"].append(f"Generation failed: {article['id']}")
+        
+        # Catch up on images for articles that came back without one
+        if not skip_images:
+            missing_images = [g for g in generated_articles if 'featured_image' not in g]
+            if missing_images:
+                logger.info(f"🖼️ Generating {len(missing_images)} featured images...")
+                generate_images_for_articles(missing_images)
+        else:
+            for generated in generated_articles:
+                generated['featured_image'] = {
+                    "generated": False,
+                    "assets_path": "assets/GD.PNG"
+                }
+        
+        for generated in generated_articles:
+            logger.info(f"✅ Generated: {generated['metadata']['slug']}")
         
         results["articles_generated"] = len(generated_articles)
         
@@ -231,33 +243,33 @@ def run_pipeline(
             logger.warning("No articles generated. Exiting.")
             return results
         
+        # Summary entries, built once for both the dry run and the publish run
+        published_entries = [
+            {
+                "slug": article['metadata']['slug'],
+                "title": article['title'],
+                "event_type": article.get('event_classification', {}).get('event_type', 'UNKNOWN')
+            }
+            for article in generated_articles
+        ]
+        
         # Step 7: Publish articles
         if test_mode:
             logger.info("\n🧪 TEST MODE: Skipping publish step")
-            for article in generated_articles:
-                ec = article.get('event_classification', {})
-                logger.info(f"  Would publish: [{ec.get('event_type', '?')}] {article['metadata']['slug']}")
-                results["published_articles"].append({
-                    "slug": article['metadata']['slug'],
-                    "title": article['title'],
-                    "event_type": ec.get('event_type', 'UNKNOWN')
-                })
+            for entry in published_entries:
+                logger.info(f"  Would publish: [{entry['event_type']}] {entry['slug']}")
         else:
             logger.info("\n📤 Step 7: Publishing articles...")
             published_count = publish_articles(generated_articles)
             results["articles_published"] = published_count
-            
-            for article in generated_articles:
-                ec = article.get('event_classification', {})
-                results["published_articles"].append({
-                    "slug": article['metadata']['slug'],
-                    "title": article['title'],
-                    "event_type": ec.get('event_type', 'UNKNOWN')
-                })
+        
+        results["published_articles"] = published_entries
         
     except Exception as e:
         logger.error(f"Pipeline error: {e}")
         results["errors"].append(str(e))
+    finally:
+        background.shutdown(wait=False, cancel_futures=True)
     
     # Finalize
     end_time = datetime.now(timezone.utc)
@@ -280,15 +292,39 @@ def run_pipeline(
     logger.info(f"  Errors:              {len(results['errors'])}")
     
     if results["published_articles"]:
-        logger.info("\n📝 Published Articles:")
-        for article in results["published_articles"]:
-            logger.info(f"  [{article.get('event_type', '?')}] {article['title'][:50]}...")
+        logger.info("\n📝 Published Articles:\n" + "\n".join(
+            f"  [{article['event_type']}] {article['title'][:50]}..."
+            for article in results["published_articles"]
+        ))
     
     logger.info("=" * 60)
     
     return results
 
 
+def configure_logging():
+    """
+    Log to the pipeline log file and stdout. Records are handed to a
+    background listener, so the pipeline threads never block on file writes.
+    """
+    handlers = [
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler(sys.stdout)
+    ]
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # flushes whatever is still queued
+    
+    # The queue handler formats each record, the listener just writes it out
+    logging.basicConfig(
+        level=getattr(logging, LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+
+
 def main():
     """CLI entry point."""
     parser = argparse.ArgumentParser(description='Auto News Radar Pipeline')
@@ -297,6 +333,7 @@ def main():
     parser.add_argument('--skip-images', action='store_true', help='Skip image generation')
     
     args = parser.parse_args()
+    configure_logging()
     
     results = run_pipeline(
         test_mode=args.test,
@@ -5,8 +5,13 @@ Generates HTML files and updates the site index.
 
 import logging
 import json
+import mmap
+import orjson
+import os
 import re
-from typing import Dict, List, Optional
+import shutil
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
 from datetime import datetime, timezone
 from pathlib import Path
 from jinja2 import Template
@@ -22,12 +27,20 @@ logger = logging.getLogger(__name__)
 # Article history file
 ARTICLES_DB = DATA_DIR / "articles.json"
 
+_MARKDOWN_MARKS_RE = re.compile(r'[#*_`\[\]]')
+_NEWLINES_RE = re.compile(r'\n+')
+
+
+@lru_cache(maxsize=1)
+def get_markdown_converter() -> markdown.Markdown:
+    """Build the Markdown converter (and load its extensions) once."""
+    return markdown.Markdown(extensions=['extra', 'codehilite', 'toc'])
+
 
 def markdown_to_html(content: str) -> str:
     """Convert markdown content to HTML."""
-    # Convert markdown to HTML
-    html = markdown.markdown(content, extensions=['extra', 'codehilite', 'toc'])
-    return html
+    # reset() clears the previous document's state (footnotes, toc, ...)
+    return get_markdown_converter().reset().convert(content)
 
 
 def get_article_template() -> str:
@@ -165,9 +178,15 @@ def get_article_template() -> str:
 </html>'''
 
 
+@lru_cache(maxsize=1)
+def get_compiled_article_template() -> Template:
+    """Compile the article template once and reuse it for every article."""
+    return Template(get_article_template())
+
+
 def generate_article_html(article: Dict) -> str:
     """Generate HTML for an article."""
-    template = Template(get_article_template())
+    template = get_compiled_article_template()
     
     metadata = article.get('metadata', {})
     image = article.get('featured_image', {})
@@ -175,15 +194,16 @@ def generate_article_html(article: Dict) -> str:
     # Convert markdown content to HTML
     content_html = markdown_to_html(article.get('content', ''))
     
-    # Format date
-    generated_at = article.get('generated_at', datetime.now(timezone.utc).isoformat())
+    # Format date (the clock is read once, and only used as a fallback)
+    now = datetime.now(timezone.utc)
+    generated_at = article.get('generated_at') or now.isoformat()
     try:
         dt = datetime.fromisoformat(generated_at.replace('Z', '+00:00'))
         formatted_date = dt.strftime('%B %d, %Y')
         published_date = dt.isoformat()
     except:
-        formatted_date = datetime.now().strftime('%B %d, %Y')
-        published_date = datetime.now(timezone.utc).isoformat()
+        formatted_date = now.astimezone().strftime('%B %d, %Y')
+        published_date = now.isoformat()
     
     html = template.render(
         title=article.get('title', ''),
@@ -204,7 +224,7 @@ def generate_article_html(article: Dict) -> str:
         published_date=published_date,
         original_link=article.get('original_link', '#'),
         original_source=article.get('original_source', 'Source'),
-        year=datetime.now().year
+        year=now.astimezone().year
     )
     
     return html
@@ -228,16 +248,16 @@ def save_article_html(article: Dict) -> Optional[Path]:
 
 def get_index_article_entry(article: Dict) -> str:
     """Generate HTML snippet for the index page."""
-    metadata = article.get('metadata', {})
-    image = article.get('featured_image', {})
-    slug = metadata.get('slug', 'article')
+    title = article.get('title', '')
+    slug = article.get('metadata', {}).get('slug', 'article')
+    image_path = article.get('featured_image', {}).get('assets_path', 'assets/GD.PNG')
     
     # Truncate summary
     content = article.get('content', '')
     summary = content[:150].rsplit(' ', 1)[0] + '...' if len(content) > 150 else content
     # Remove markdown
-    summary = re.sub(r'[#*_`\[\]]', '', summary)
-    summary = re.sub(r'\n+', ' ', summary)
+    summary = _MARKDOWN_MARKS_RE.sub('', summary)
+    summary = _NEWLINES_RE.sub(' ', summary)
     
     return f'''
               <div class="post-outer">
@@ -245,19 +265,19 @@ def get_index_article_entry(article: Dict) -> str:
                   <div class="img-thumbnail-wrap">
                     <div class="img-thumbnail" style="overflow: hidden; display: flex; align-items: center; justify-content: center;">
                       <a href="articles/{slug}.html">
-                        <img alt="{article.get('title', '')}" style="width: 100%; height: 162px; object-fit: cover; object-position: center;" src="{image.get('assets_path', 'assets/GD.PNG')}"
-                          title="{article.get('title', '')}">
+                        <img alt="{title}" style="width: 100%; height: 162px; object-fit: cover; object-position: center;" src="{image_path}"
+                          title="{title}">
                         <div class="lazy-loading"></div>
                       </a>
                     </div>
                   </div>
                   <h2 class="post-title entry-title">
-                    <a href="articles/{slug}.html">{article.get('title', '')}</a>
+                    <a href="articles/{slug}.html">{title}</a>
                   </h2>
                   <div class="post-body entry-content">
                     <div class="post-snippet">
                       {summary}
-                      <a class="read-more-link" href="articles/{slug}.html" title="{article.get('title', '')}">
+                      <a class="read-more-link" href="articles/{slug}.html" title="{title}">
                         Read more »
                       </a>
                     </div>
@@ -273,26 +293,32 @@ def update_index_page(articles: List[Dict]) -> bool:
     index_path = SITE_DIR / "index.html"
     
     try:
-        # Read current index
-        content = index_path.read_text(encoding='utf-8')
-        
         # Generate new article entries
         new_entries = '\n'.join([get_index_article_entry(a) for a in articles])
         
         # Find insertion point (after "blog-posts" div opening)
         # Insert after the "Postingan Terbaru" section
-        marker = '<div class="blog-posts">'
-        if marker in content:
-            parts = content.split(marker, 1)
-            # Insert our new articles right after the blog-posts div
-            new_content = parts[0] + marker + '\n' + new_entries + parts[1]
+        marker = b'<div class="blog-posts">'
+        with open(index_path, 'rb') as index_file:
+            with mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ) as index_map:
+                offset = index_map.find(marker)
+            
+            if offset == -1:
+                logger.warning("Could not find insertion point in index.html")
+                return False
+            offset += len(marker)
             
-            index_path.write_text(new_content, encoding='utf-8')
-            logger.info(f"Updated index.html with {len(articles)} new articles")
-            return True
-        else:
-            logger.warning("Could not find insertion point in index.html")
-            return False
+            # Copy the page around the new entries as raw bytes, then swap
+            # the finished file in
+            tmp_path = index_path.with_name(index_path.name + '.tmp')
+            with open(tmp_path, 'wb') as out:
+                out.write(index_file.read(offset))
+                out.write(b'\n' + new_entries.encode('utf-8'))
+                shutil.copyfileobj(index_file, out)
+        
+        os.replace(tmp_path, index_path)
+        logger.info(f"Updated index.html with {len(articles)} new articles")
+        return True
             
     except Exception as e:
         logger.error(f"Error updating index.html: {e}")
@@ -303,7 +329,7 @@ def load_articles_db() -> Dict:
     """Load the articles database."""
     if ARTICLES_DB.exists():
         try:
-            return json.loads(ARTICLES_DB.read_text(encoding='utf-8'))
+            return orjson.loads(ARTICLES_DB.read_bytes())
         except:
             pass
     return {"articles": [], "last_updated": None}
@@ -320,16 +346,19 @@ def save_articles_db(db: Dict) -> bool:
         return False
 
 
+def get_published_ids() -> Set[str]:
+    """Get the IDs of all articles in the database (one read)."""
+    db = load_articles_db()
+    return {a.get('id') for a in db.get('articles', [])}
+
+
 def article_exists(article_id: str) -> bool:
     """Check if an article already exists."""
-    db = load_articles_db()
-    return any(a.get('id') == article_id for a in db.get('articles', []))
+    return article_id in get_published_ids()
 
 
-def save_article_to_db(article: Dict) -> bool:
-    """Save article metadata to the database."""
-    db = load_articles_db()
-    
+def add_article_to_db(db: Dict, article: Dict) -> None:
+    """Add an article's metadata to an in-memory database."""
     # Add summary entry (not full content)
     entry = {
         "id": article.get('id'),
@@ -346,18 +375,33 @@ def save_article_to_db(article: Dict) -> bool:
     
     # Keep only last 500 articles
     db['articles'] = db['articles'][:500]
-    
+
+
+def save_article_to_db(article: Dict) -> bool:
+    """Save article metadata to the database."""
+    db = load_articles_db()
+    add_article_to_db(db, article)
     return save_articles_db(db)
 
 
-def publish_article(article: Dict) -> bool:
+def publish_article(article: Dict, db: Dict = None, existing_ids: Set[str] = None) -> bool:
     """
     Main function: Publish an article to the static site.
+    With db, the entry goes into that in-memory database and the caller
+    saves it; otherwise the database is loaded and saved here.
+    existing_ids is the caller's set of ids already in db; it is updated
+    as articles are published.
     """
     logger.info(f"Publishing: {article.get('title', '')[:50]}...")
     
+    standalone = db is None
+    if standalone:
+        db = load_articles_db()
+    if existing_ids is None:
+        existing_ids = {a.get('id') for a in db['articles']}
+    
     # Check if already published
-    if article_exists(article.get('id')):
+    if article.get('id') in existing_ids:
         logger.warning(f"Article already exists: {article.get('id')}")
         return False
     
@@ -367,7 +411,10 @@ def publish_article(article: Dict) -> bool:
         return False
     
     # Save to database
-    save_article_to_db(article)
+    add_article_to_db(db, article)
+    existing_ids.add(article.get('id'))
+    if standalone:
+        save_articles_db(db)
     
     logger.info(f"Article published: {filepath.name}")
     return True
@@ -378,10 +425,18 @@ def publish_articles(articles: List[Dict]) -> int:
     published_count = 0
     published_articles = []
     
-    for article in articles:
-        if publish_article(article):
-            published_count += 1
-            published_articles.append(article)
+    # Read the database once, add every entry in memory, write it once
+    # (also when a later article fails, so written pages keep their entries)
+    db = load_articles_db()
+    existing_ids = {a.get('id') for a in db['articles']}
+    try:
+        for article in articles:
+            if publish_article(article, db, existing_ids):
+                published_count += 1
+                published_articles.append(article)
+    finally:
+        if published_articles:
+            save_articles_db(db)
     
     # Update index page
     if published_articles:
@@ -390,7 +445,7 @@ def publish_articles(articles: List[Dict]) -> int:
         # Update sitemap.xml
         try:
             from .sitemap_generator import update_sitemap
-            update_sitemap()
+            update_sitemap(db['articles'])
             logger.info("Sitemap updated")
         except Exception as e:
             logger.warning(f"Sitemap update failed: {e}")
@@ -9,11 +9,18 @@ from typing import List, Dict, Optional
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import hashlib
+import orjson
+import re
 
 from .config import RSS_FEEDS, ARTICLE_CONFIG
+from .http_session import get_http_session
+from .cache import get_cached, set_cached
 
 logger = logging.getLogger(__name__)
 
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
 
 def parse_date(date_string: str) -> Optional[datetime]:
     """Parse various date formats from RSS feeds."""
@@ -50,13 +57,47 @@ def generate_article_id(url: str) -> str:
     return hashlib.md5(url.encode()).hexdigest()[:12]
 
 
+def _restore_cached_articles(cached_articles: List[Dict]) -> List[Dict]:
+    """Turn articles stored by fetch_single_feed back into fetched articles."""
+    for article in cached_articles:
+        if article['published']:
+            article['published'] = datetime.fromisoformat(article['published'])
+    return cached_articles
+
+
 def fetch_single_feed(feed_info: Dict) -> List[Dict]:
-    """Fetch articles from a single RSS feed."""
+    """
+    Fetch articles from a single RSS feed.
+    The previous run's ETag / Last-Modified are sent along; if the feed
+    hasn't changed, the articles parsed last time are reused.
+    """
     articles = []
     
     try:
         logger.info(f"Fetching: {feed_info['name']}")
-        feed = feedparser.parse(feed_info['url'])
+        
+        cached = get_cached("feed_conditional", feed_info['url'])
+        previous = orjson.loads(cached) if cached else None
+        
+        request_headers = {}
+        if previous:
+            if previous.get("etag"):
+                request_headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                request_headers["If-Modified-Since"] = previous["last_modified"]
+        
+        # Download over the shared pooled session (with a timeout), then let
+        # feedparser parse the bytes. content-location keeps relative links
+        # resolving against the feed URL as they did when feedparser fetched it
+        response = get_http_session().get(feed_info['url'], headers=request_headers, timeout=15)
+        if response.status_code == 304 and previous:
+            articles = _restore_cached_articles(previous["articles"])
+            logger.info(f"Not modified, reusing {len(articles)} articles from {feed_info['name']}")
+            return articles
+        response.raise_for_status()
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        headers['content-location'] = response.url
+        feed = feedparser.parse(response.content, response_headers=headers)
         
         if feed.bozo and feed.bozo_exception:
             logger.warning(f"Feed error for {feed_info['name']}: {feed.bozo_exception}")
@@ -87,6 +128,15 @@ def fetch_single_feed(feed_info: Dict) -> List[Dict]:
         
         logger.info(f"Fetched {len(articles)} articles from {feed_info['name']}")
         
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            set_cached("feed_conditional", feed_info['url'], orjson.dumps({
+                "etag": etag,
+                "last_modified": last_modified,
+                "articles": articles
+            }).decode())
+        
     except Exception as e:
         logger.error(f"Error fetching {feed_info['name']}: {e}")
     
@@ -150,9 +200,8 @@ def deduplicate_articles(articles: List[Dict]) -> List[Dict]:
 
 def clean_html(text: str) -> str:
     """Remove HTML tags from text."""
-    import re
-    clean = re.sub(r'<[^>]+>', '', text)
-    clean = re.sub(r'\s+', ' ', clean)
+    clean = _HTML_TAG_RE.sub('', text)
+    clean = _WHITESPACE_RE.sub(' ', clean)
     return clean.strip()
 
 
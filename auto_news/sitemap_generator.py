@@ -3,7 +3,7 @@ Auto News Pipeline - Sitemap Generator
 Automatically generates/updates sitemap.xml when articles are published.
 """
 
-import json
+import orjson
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict
@@ -14,22 +14,23 @@ SITEMAP_PATH = SITE_DIR / "sitemap.xml"
 ARTICLES_JSON = DATA_DIR / "articles.json"
 
 
-def generate_sitemap() -> str:
+def generate_sitemap(articles: List[Dict] = None) -> str:
     """
-    Generate sitemap.xml content from articles.json.
-    Called automatically after publishing new articles.
+    Generate sitemap.xml content from the published articles.
+    Called automatically after publishing new articles, with the articles
+    already in memory; otherwise they are loaded from articles.json.
     """
     
     # Load published articles
-    articles = []
-    if ARTICLES_JSON.exists():
-        with open(ARTICLES_JSON, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    if articles is None:
+        articles = []
+        if ARTICLES_JSON.exists():
+            data = orjson.loads(ARTICLES_JSON.read_bytes())
             articles = data.get('articles', [])
     
     # Start XML
     xml = ['<?xml version="1.0" encoding="UTF-8"?>']
-    xml.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">')
+    xml.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"')
     xml.append('        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">')
     
     # Homepage
@@ -39,7 +40,8 @@ def generate_sitemap() -> str:
     xml.append('    <priority>1.0</priority>')
     xml.append('  </url>')
     
-    # Articles
+    # Articles (one string per <url> block)
+    today = datetime.now().strftime('%Y-%m-%d')
     for article in articles:
         slug = article.get('slug', '')
         generated_at = article.get('generated_at', '')
@@ -49,14 +51,16 @@ def generate_sitemap() -> str:
             dt = datetime.fromisoformat(generated_at.replace('Z', '+00:00'))
             lastmod = dt.strftime('%Y-%m-%d')
         except:
-            lastmod = datetime.now().strftime('%Y-%m-%d')
+            lastmod = today
         
-        xml.append('  <url>')
-        xml.append(f'    <loc>{SITE_URL}/articles/{slug}.html</loc>')
-        xml.append(f'    <lastmod>{lastmod}</lastmod>')
-        xml.append('    <changefreq>weekly</changefreq>')
-        xml.append('    <priority>0.8</priority>')
-        xml.append('  </url>')
+        xml.append(
+            '  <url>\n'
+            f'    <loc>{SITE_URL}/articles/{slug}.html</loc>\n'
+            f'    <lastmod>{lastmod}</lastmod>\n'
+            '    <changefreq>weekly</changefreq>\n'
+            '    <priority>0.8</priority>\n'
+            '  </url>'
+        )
     
     # Trust pages
     trust_pages = ['about.html', 'privacy.html', 'editorial-policy.html']
@@ -72,11 +76,11 @@ def generate_sitemap() -> str:
     return '\n'.join(xml)
 
 
-def update_sitemap() -> None:
+def update_sitemap(articles: List[Dict] = None) -> None:
     """
     Update the sitemap.xml file.
     """
-    content = generate_sitemap()
+    content = generate_sitemap(articles)
     
     with open(SITEMAP_PATH, 'w', encoding='utf-8') as f:
         f.write(content)